@@ -0,0 +1,202 @@
+import base64
+import bisect
+import json
+import sqlite3
+import numpy as np
+
+class _Partition:
+    def __init__(self, capacity=1024):
+        """
+        Anomalies of one time partition, kept sorted by (timestamp, seq).
+        """
+        self.timestamps = np.empty(capacity, dtype=np.float64)
+        self.risk_scores = np.empty(capacity, dtype=np.float64)
+        self.seqs = np.empty(capacity, dtype=np.int64)
+        self.events = []
+        self.size = 0
+        self.max_risk = -np.inf
+        self.sorted = True
+        self.risk_order = None  # Positions sorted by risk score, built on demand
+        self.sorted_risks = None
+
+    def append(self, timestamps, risk_scores, seqs, events):
+        count = len(timestamps)
+        if self.size + count > len(self.timestamps):
+            capacity = max(2 * len(self.timestamps), self.size + count)
+            for name in ("timestamps", "risk_scores", "seqs"):
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+        if self.size and timestamps.min() < self.timestamps[self.size - 1] or np.any(np.diff(timestamps) < 0):
+            self.sorted = False
+        end = self.size + count
+        self.timestamps[self.size:end] = timestamps
+        self.risk_scores[self.size:end] = risk_scores
+        self.seqs[self.size:end] = seqs
+        self.events.extend(events)
+        self.size = end
+        self.max_risk = max(self.max_risk, float(risk_scores.max()))
+        self.risk_order = None
+
+    def ensure_sorted(self):
+        # Late arrivals are appended as they come and sorted in once, on the next query
+        if not self.sorted:
+            order = np.lexsort((self.seqs[:self.size], self.timestamps[:self.size]))
+            for name in ("timestamps", "risk_scores", "seqs"):
+                values = getattr(self, name)
+                values[:self.size] = values[:self.size][order]
+            self.events = [self.events[i] for i in order]
+            self.sorted = True
+
+    def positions(self, start_time, end_time, min_risk_score, after=None, use_risk_index=False):
+        """
+        Returns positions with start_time <= timestamp <= end_time and a risk score of at
+        least min_risk_score, in (timestamp, seq) order, optionally after a (timestamp, seq) cursor.
+        """
+        self.ensure_sorted()
+        timestamps = self.timestamps[:self.size]
+        lo = np.searchsorted(timestamps, start_time, side="left")
+        hi = np.searchsorted(timestamps, end_time, side="right")
+        if after is not None and lo < hi and timestamps[lo] <= after[0]:
+            lo = np.searchsorted(timestamps, after[0], side="left")
+            same = np.searchsorted(timestamps, after[0], side="right")
+            lo += np.searchsorted(self.seqs[lo:same], after[1], side="right")
+        if lo >= hi:
+            return np.empty(0, dtype=np.intp)
+
+        risk_scores = self.risk_scores[:self.size]
+        if use_risk_index:
+            if self.risk_order is None:
+                self.risk_order = np.argsort(risk_scores, kind="stable")
+                self.sorted_risks = risk_scores[self.risk_order]
+            first = np.searchsorted(self.sorted_risks, min_risk_score, side="left")
+            # Use the risk index when few anomalies pass the threshold, else scan the time range
+            if self.size - first < hi - lo:
+                candidates = np.sort(self.risk_order[first:])
+                return candidates[(candidates >= lo) & (candidates < hi)]
+        return lo + np.flatnonzero(risk_scores[lo:hi] >= min_risk_score)
+
+class AnomalyStore:
+    def __init__(self, partition_seconds=86400, db_path=None, max_partitions=None):
+        """
+        Append-only anomaly history partitioned by time, for range queries by timestamp
+        and minimum risk score.
+
+        Each partition keeps sorted timestamp arrays for binary-search range lookups and a
+        per-partition risk score index, so selective min_risk_score filters skip most
+        anomalies. Results come back in pages addressed by an opaque cursor.
+
+        :param partition_seconds: Time span of one partition.
+        :param db_path: Optional SQLite file; anomalies are persisted there and reloaded on open.
+        :param max_partitions: Optional number of most recent partitions to keep in memory.
+        """
+        self.partition_seconds = partition_seconds
+        self.max_partitions = max_partitions
+        self.partitions = {}
+        self.partition_keys = []  # Sorted keys of self.partitions
+        self.next_seq = 0
+        self.db = None
+        if db_path is not None:
+            self.db = sqlite3.connect(db_path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS anomalies "
+                            "(seq INTEGER PRIMARY KEY, timestamp REAL, risk_score REAL, event TEXT)")
+            self._load()
+
+    def _load(self):
+        rows = self.db.execute("SELECT seq, timestamp, risk_score, event FROM anomalies ORDER BY seq").fetchall()
+        if rows:
+            seqs, timestamps, risk_scores, events = zip(*rows)
+            self._append(np.array(timestamps), np.array(risk_scores), np.array(seqs), [json.loads(e) for e in events])
+            self.next_seq = seqs[-1] + 1
+
+    def add(self, timestamps, risk_scores, events):
+        """
+        Appends a batch of anomalies.
+
+        :param timestamps: Unix timestamp of each anomaly.
+        :param risk_scores: Risk score of each anomaly.
+        :param events: Event dict returned for each anomaly.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        risk_scores = np.asarray(risk_scores, dtype=np.float64)
+        if not len(timestamps):
+            return
+        seqs = np.arange(self.next_seq, self.next_seq + len(timestamps), dtype=np.int64)
+        self.next_seq += len(timestamps)
+        self._append(timestamps, risk_scores, seqs, events)
+        if self.db is not None:
+            with self.db:
+                self.db.executemany("INSERT INTO anomalies VALUES (?, ?, ?, ?)",
+                                    zip(seqs.tolist(), timestamps.tolist(), risk_scores.tolist(),
+                                        map(json.dumps, events)))
+
+    def _append(self, timestamps, risk_scores, seqs, events):
+        keys = (timestamps // self.partition_seconds).astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        for key, group in zip(unique_keys.tolist(), np.split(order, starts[1:])):
+            partition = self.partitions.get(key)
+            if partition is None:
+                partition = self.partitions[key] = _Partition()
+                bisect.insort(self.partition_keys, key)
+            partition.append(timestamps[group], risk_scores[group], seqs[group], [events[i] for i in group])
+        if self.max_partitions is not None:
+            while len(self.partition_keys) > self.max_partitions:
+                del self.partitions[self.partition_keys.pop(0)]
+
+    def scan(self, start_time, end_time, min_risk_score=0.0, after=None):
+        """
+        Yields (timestamp, seq, event) for matching anomalies in time order, one
+        partition at a time, optionally resuming after a (timestamp, seq) position.
+        """
+        if after is not None:
+            start_time = max(start_time, after[0])
+        first = bisect.bisect_left(self.partition_keys, int(start_time // self.partition_seconds))
+        last = bisect.bisect_right(self.partition_keys, int(end_time // self.partition_seconds))
+        newest = self.partition_keys[-1] if self.partition_keys else None
+        for key in self.partition_keys[first:last]:
+            partition = self.partitions[key]
+            if partition.max_risk < min_risk_score:
+                continue
+            # The newest partition changes constantly, so it is scanned rather than indexed
+            positions = partition.positions(start_time, end_time, min_risk_score, after, key != newest)
+            for position in positions.tolist():
+                yield partition.timestamps[position], partition.seqs[position], partition.events[position]
+
+    def query(self, start_time, end_time, min_risk_score=0.0, limit=100, cursor=None):
+        """
+        Returns one page of matching anomalies in time order.
+
+        :param cursor: Cursor returned with the previous page, or None for the first page.
+        :return: (events, next_cursor); next_cursor is None once there are no more results.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        events = []
+        last = None
+        for timestamp, seq, event in self.scan(start_time, end_time, min_risk_score, after):
+            if len(events) == limit:
+                return events, encode_cursor(*last)
+            events.append(event)
+            last = (timestamp, seq)
+        return events, None
+
+    def __len__(self):
+        return sum(partition.size for partition in self.partitions.values())
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+def encode_cursor(timestamp, seq):
+    return base64.urlsafe_b64encode(f"{float(timestamp)!r}:{int(seq)}".encode()).decode()
+
+def decode_cursor(cursor):
+    """
+    Returns the (timestamp, seq) position of a cursor; raises ValueError if it is malformed.
+    """
+    try:
+        timestamp, seq = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(timestamp), int(seq)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
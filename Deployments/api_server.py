@@ -0,0 +1,484 @@
+import argparse
+import asyncio
+import importlib.util
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import orjson
+from aiohttp import ClientSession, TCPConnector, web
+from anomaly_store import AnomalyStore
+from event_log import EventLogReader
+from monitor_stream import MonitorHub
+from risk_cache import RiskCache
+from transactions import TRANSACTION_DTYPE, TransactionWindow, tokens, wallets
+
+DEPLOYMENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(os.path.dirname(DEPLOYMENTS_DIR), "api")
+
+def load_script(name, directory=DEPLOYMENTS_DIR):
+    """
+    Imports a hyphenated script, e.g. load_script("metrics-comp-system").
+    """
+    module_name = name.replace("-", "_")
+    if module_name not in sys.modules:
+        path = os.path.join(directory, f"{name}.py")
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
+
+BatchScoreAggregator = load_script("metrics-comp-system").BatchScoreAggregator
+rate_limiting = load_script("Rate-limiting", API_DIR)
+
+TIMEFRAMES = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+
+# Weights of the per-token analyses: top wallet concentration, whale volume share, activity
+ANALYSIS_WEIGHTS = [0.4, 0.4, 0.2]
+
+# Responses smaller than this are sent uncompressed; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = 1024
+
+# Largest page returned by GET /api/v1/anomalies; further results are fetched with next_cursor
+MAX_PAGE_SIZE = 1000
+
+# Monitored tokens that may be added per minute through POST /api/v1/monitor, at each level
+MONITOR_RATE_LIMITS = {
+    "global": 100_000,
+    "api_key": 5_000,
+    "endpoint": 20_000,
+}
+
+# Seconds a streaming client may take to accept one message before it is disconnected
+STREAM_SEND_TIMEOUT = 10.0
+
+# Settings from api/WebSocket.json
+WS_PING_INTERVAL = 30
+WS_MAX_MESSAGE_SIZE = 1024 * 1024
+
+SYNTHETIC_TOKENS = [f"TOKEN{i:03d}" for i in range(100)]
+
+class ApiError(Exception):
+    def __init__(self, status, code, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.details = details or {}
+
+def json_response(payload, status=200):
+    body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    response = web.Response(body=body, status=status, content_type="application/json")
+    if len(body) >= COMPRESS_MIN_BYTES:
+        response.enable_compression()  # gzip or deflate, as negotiated by Accept-Encoding
+    return response
+
+def error_response(status, code, message, details=None):
+    """
+    Builds an error in the format of api/Error-handling.json.
+    """
+    return json_response({"error": {"code": code, "message": message, "details": details or {}}}, status)
+
+def to_iso(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+def parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        raise ApiError(400, "invalid_parameter", f"{name} must be an ISO 8601 datetime.", {"parameter": name})
+
+class TokenAnalysisService:
+    def __init__(self, window_size=1 << 20, whale_threshold=1_000_000, max_workers=None, cache=None,
+                 anomaly_store=None):
+        """
+        Serves token analyses over the most recent transactions.
+
+        Analyses are computed on a thread pool, since the NumPy work releases the GIL,
+        and memoized in a RiskCache that ingest() invalidates per token.
+
+        :param window_size: Number of recent transactions kept for analysis.
+        :param whale_threshold: Minimum transaction amount reported as a whale movement.
+        :param max_workers: Size of the analysis thread pool.
+        :param cache: RiskCache to use; a default one is created if omitted.
+        :param anomaly_store: AnomalyStore recording whale movements; an in-memory one is created if omitted.
+        """
+        self.window = TransactionWindow(window_size)
+        self.whale_threshold = whale_threshold
+        self.scorer = BatchScoreAggregator(ANALYSIS_WEIGHTS)
+        self.cache = cache if cache is not None else RiskCache()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.anomalies = anomaly_store if anomaly_store is not None else AnomalyStore()
+        self.anomaly_listeners = []  # Called with the event dicts of each ingested batch of anomalies
+        self.generation = 0          # Bumped by every ingest; analyses that overlap one are not cached
+
+    def ingest(self, records):
+        """
+        Adds a TRANSACTION_DTYPE batch and records whale movements as anomalies.
+        """
+        self.generation += 1
+        self.window.extend(records)
+        self.cache.ingest(records)
+        whales = records[records["amount"] >= self.whale_threshold]
+        if len(whales):
+            events = [self._anomaly_event(row) for row in whales]
+            self.anomalies.add(whales["timestamp"], self._whale_risk(whales["amount"]), events)
+            for listener in self.anomaly_listeners:
+                listener(events)
+
+    def _whale_risk(self, amount):
+        # 0.5 at the whale threshold, approaching 1 for much larger movements
+        return amount / (amount + self.whale_threshold)
+
+    def _anomaly_event(self, row):
+        amount = float(row["amount"])
+        return {
+            "token_address": tokens.resolve(row["token"]),
+            "risk_score": self._whale_risk(amount),
+            "anomaly_type": "whale_movement",
+            "timestamp": to_iso(row["timestamp"]),
+            "details": {"wallet_address": wallets.resolve(row["wallet"]), "amount": amount},
+        }
+
+    def analyze(self, token, timeframe, max_anomalies=20):
+        """
+        Computes the risk score, whale anomalies and volume metrics of one token.
+        Runs on the executor, reading the window in place; a concurrent ingest may
+        overwrite rows while they are read, so _compute does not cache such a result.
+        """
+        token_id = tokens.lookup(token)
+        records = self.window.buffer[:len(self.window)]
+        mask = (records["token"] == token_id) & (records["timestamp"] >= time.time() - TIMEFRAMES[timeframe])
+        selected = records[mask] if token_id >= 0 else records[:0]
+
+        amounts = selected["amount"]
+        volume = float(amounts.sum())
+        whale_mask = amounts >= self.whale_threshold
+        if len(selected):
+            wallet_volume = np.bincount(selected["wallet"], weights=amounts)
+            top_wallet_share = float(wallet_volume.max() / volume) if volume else 0.0
+            unique_wallets = int(np.count_nonzero(wallet_volume))
+        else:
+            top_wallet_share = 0.0
+            unique_wallets = 0
+        whale_share = float(amounts[whale_mask].sum() / volume) if volume else 0.0
+        activity = len(selected) / (len(selected) + 1000.0)
+
+        # Each analysis in [0, 1] is mapped to a logit in [-4, 4] before aggregation
+        analyses = np.array([[top_wallet_share], [whale_share], [activity]])
+        risk_score = float(self.scorer.score(8.0 * (analyses - 0.5))[0])
+
+        whales = selected[whale_mask]
+        whales = whales[np.argsort(whales["amount"])[::-1][:max_anomalies]]
+        return {
+            "risk_score": risk_score,
+            "anomalies": [self._anomaly_event(row) for row in whales],
+            "metrics": {
+                "transaction_count": float(len(selected)),
+                "volume": volume,
+                "average_amount": volume / len(selected) if len(selected) else 0.0,
+                "max_amount": float(amounts.max()) if len(selected) else 0.0,
+                "unique_wallets": float(unique_wallets),
+                "top_wallet_share": top_wallet_share,
+                "whale_volume_share": whale_share,
+            },
+        }
+
+    async def analysis(self, token, timeframe):
+        return await self.cache.get_or_compute(token, timeframe, self._compute)
+
+    async def _compute(self, token, timeframe):
+        loop = asyncio.get_running_loop()
+        generation = self.generation
+        result = await loop.run_in_executor(self.executor, self.analyze, token, timeframe)
+        if self.generation != generation:
+            # Overwritten slots may have mixed other tokens' records into the result
+            self.cache.detach(token, timeframe)
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.anomalies.close()
+
+@web.middleware
+async def error_middleware(request, handler):
+    try:
+        return await handler(request)
+    except ApiError as e:
+        return error_response(e.status, e.code, e.message, e.details)
+    except web.HTTPException as e:
+        return error_response(e.status, e.reason.lower().replace(" ", "_"), e.reason)
+    except Exception as e:
+        print(f"Unhandled error on {request.method} {request.path}: {e!r}")
+        return error_response(500, "internal_error", "Internal Server Error")
+
+async def stream_websocket(request, subscriber):
+    ws = web.WebSocketResponse(heartbeat=WS_PING_INTERVAL, max_msg_size=WS_MAX_MESSAGE_SIZE, compress=True)
+    await ws.prepare(request)
+
+    async def read_until_closed():
+        # Clients send nothing, but reading handles pings and notices disconnects
+        async for _ in ws:
+            pass
+        subscriber.close()
+
+    reader = asyncio.create_task(read_until_closed())
+    try:
+        async for message in subscriber.messages():
+            await asyncio.wait_for(ws.send_str(message), STREAM_SEND_TIMEOUT)
+    except (asyncio.TimeoutError, ConnectionResetError):
+        pass
+    finally:
+        reader.cancel()
+        await ws.close()
+    return ws
+
+async def stream_events(request, subscriber):
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    try:
+        async for message in subscriber.messages():
+            await asyncio.wait_for(response.write(f"data: {message}\n\n".encode()), STREAM_SEND_TIMEOUT)
+    except (asyncio.TimeoutError, ConnectionResetError):
+        pass
+    return response
+
+def make_monitor_rate_limiter():
+    levels = {name: rate_limiting.RateLimiter(rate_limit=limit, window=60)
+              for name, limit in MONITOR_RATE_LIMITS.items()}
+    return rate_limiting.HierarchicalRateLimiter(levels)
+
+def create_app(service, hub, monitor_rate_limiter=None):
+    """
+    Builds the aiohttp application serving the endpoints described in api/Endpoint.py,
+    plus a WebSocket/server-sent events stream of monitoring updates.
+    """
+    if monitor_rate_limiter is None:
+        monitor_rate_limiter = make_monitor_rate_limiter()
+    routes = web.RouteTableDef()
+
+    @routes.get("/api/v1/token/{token_address}/analysis")
+    async def token_analysis(request):
+        timeframe = request.query.get("timeframe", "24h")
+        if timeframe not in TIMEFRAMES:
+            raise ApiError(400, "invalid_parameter", f"timeframe must be one of {', '.join(TIMEFRAMES)}.",
+                           {"parameter": "timeframe"})
+        return json_response(await service.analysis(request.match_info["token_address"], timeframe))
+
+    @routes.post("/api/v1/monitor")
+    async def monitor(request):
+        try:
+            body = orjson.loads(await request.read())
+        except orjson.JSONDecodeError:
+            raise ApiError(400, "invalid_body", "Request body must be JSON.")
+        token_addresses = body.get("token_addresses") if isinstance(body, dict) else None
+        update_interval = body.get("update_interval") if isinstance(body, dict) else None
+        if not isinstance(token_addresses, list) or not all(isinstance(t, str) for t in token_addresses):
+            raise ApiError(400, "invalid_parameter", "token_addresses must be a list of strings.",
+                           {"parameter": "token_addresses"})
+        if not isinstance(update_interval, int) or update_interval <= 0:
+            raise ApiError(400, "invalid_parameter", "update_interval must be a positive integer.",
+                           {"parameter": "update_interval"})
+
+        # A bulk request costs one limiter operation, charged one unit per token at every level
+        scopes = {"api_key": request.headers.get("X-API-Key", request.remote), "endpoint": "monitor"}
+        try:
+            wait = await monitor_rate_limiter.acquire(scopes, max(len(token_addresses), 1))
+        except ValueError as e:
+            raise ApiError(400, "invalid_parameter", str(e), {"parameter": "token_addresses"})
+        if wait:
+            response = error_response(429, "rate_limit_exceeded", "Rate Limit Exceeded", {"retry_after": wait})
+            response.headers["Retry-After"] = str(math.ceil(wait))
+            return response
+
+        monitoring_ids = hub.start_monitoring(token_addresses, update_interval)
+        return json_response({"status": "monitoring", "monitoring_ids": monitoring_ids})
+
+    @routes.get("/api/v1/monitor/stream")
+    async def monitor_stream(request):
+        """
+        Streams updates for ?monitoring_ids=id1,id2 over a WebSocket if the client asks
+        for an upgrade, or as server-sent events otherwise.
+        """
+        monitoring_ids = [i for i in request.query.get("monitoring_ids", "").split(",") if i]
+        if not monitoring_ids:
+            raise ApiError(400, "invalid_parameter", "monitoring_ids is required.", {"parameter": "monitoring_ids"})
+        try:
+            subscriber = hub.subscribe(monitoring_ids)
+        except KeyError as e:
+            raise ApiError(404, "not_found", "Unknown monitoring id.", {"monitoring_id": e.args[0]})
+        except OverflowError as e:
+            raise ApiError(503, "too_many_connections", str(e))
+        try:
+            if request.headers.get("Upgrade", "").lower() == "websocket":
+                return await stream_websocket(request, subscriber)
+            return await stream_events(request, subscriber)
+        finally:
+            hub.unsubscribe(subscriber)
+
+    @routes.get("/api/v1/anomalies")
+    async def anomalies(request):
+        start_time = parse_time(request.query.get("start_time", "1970-01-01T00:00:00Z"), "start_time")
+        end_time = parse_time(request.query["end_time"], "end_time") if "end_time" in request.query else time.time()
+        try:
+            min_risk_score = float(request.query.get("min_risk_score", 0.0))
+        except ValueError:
+            raise ApiError(400, "invalid_parameter", "min_risk_score must be a number.", {"parameter": "min_risk_score"})
+        try:
+            limit = int(request.query.get("limit", 100))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ApiError(400, "invalid_parameter", f"limit must be between 1 and {MAX_PAGE_SIZE}.",
+                           {"parameter": "limit"})
+        try:
+            anomalies, next_cursor = service.anomalies.query(start_time, end_time, min_risk_score, limit,
+                                                             request.query.get("cursor"))
+        except ValueError as e:
+            raise ApiError(400, "invalid_parameter", str(e), {"parameter": "cursor"})
+        return json_response({"anomalies": anomalies, "next_cursor": next_cursor})
+
+    @routes.get("/health")
+    async def health(request):
+        return json_response({"status": "ok", "cache": service.cache.stats(), "streams": len(hub.subscribers)})
+
+    async def close_streams(app):
+        hub.close()
+
+    app = web.Application(middlewares=[error_middleware])
+    app.add_routes(routes)
+    app.on_shutdown.append(close_streams)
+    return app
+
+# Synthetic transaction feed for local runs and load tests
+async def synthetic_feed(service, stop_event, batch_size=1000, interval=0.1):
+    token_ids = np.array([tokens.intern(token) for token in SYNTHETIC_TOKENS], dtype=np.uint32)
+    wallet_ids = np.array([wallets.intern(f"0x{i:04X}") for i in range(1000)], dtype=np.uint32)
+    batch = np.empty(batch_size, dtype=TRANSACTION_DTYPE)
+    tx_id = 0
+    while not stop_event.is_set():
+        batch["tx_id"] = np.arange(tx_id, tx_id + batch_size)
+        batch["wallet"] = np.random.choice(wallet_ids, batch_size)
+        batch["token"] = np.random.choice(token_ids, batch_size)
+        batch["amount"] = np.random.lognormal(mean=8.0, sigma=2.5, size=batch_size)
+        batch["timestamp"] = time.time()
+        service.ingest(batch)
+        tx_id += batch_size
+        await asyncio.sleep(interval)
+
+# Loads a recorded event log into the service, yielding to request handling between batches
+async def replay_feed(service, log_dir, batch_size=65536):
+    for batch in EventLogReader(log_dir).batches(batch_size):
+        service.ingest(batch)
+        await asyncio.sleep(0)
+
+async def serve(host="127.0.0.1", port=8080, replay_dir=None, max_workers=None, anomaly_db=None):
+    service = TokenAnalysisService(max_workers=max_workers, anomaly_store=AnomalyStore(db_path=anomaly_db))
+    hub = MonitorHub(service)
+    runner = web.AppRunner(create_app(service, hub), keepalive_timeout=75, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port, backlog=1024).start()
+    print(f"Serving on http://{host}:{port}")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    feed = asyncio.create_task(replay_feed(service, replay_dir) if replay_dir else synthetic_feed(service, stop_event))
+    streams = asyncio.create_task(hub.run())
+    try:
+        await stop_event.wait()
+    finally:
+        feed.cancel()
+        streams.cancel()
+        await runner.cleanup()
+        service.close()
+
+async def load_test(url, concurrency=64, duration=10.0, timeframe="24h", token_addresses=SYNTHETIC_TOKENS):
+    """
+    Issues token analysis requests from `concurrency` keep-alive clients for `duration`
+    seconds. Tokens are drawn with a Zipf-like skew, so a few popular tokens dominate
+    as in production.
+
+    :return: Dict with request and error counts, requests/sec and p50/p99 latency in ms.
+    """
+    popularity = [1.0 / (rank + 1) for rank in range(len(token_addresses))]
+    latencies = []
+    errors = 0
+
+    async def client(session, deadline):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            token = random.choices(token_addresses, popularity)[0]
+            start = time.perf_counter()
+            async with session.get(f"{url}/api/v1/token/{token}/analysis", params={"timeframe": timeframe}) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = TCPConnector(limit=concurrency)
+    async with ClientSession(connector=connector, headers={"Accept-Encoding": "gzip"}) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session, start + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": float(p50),
+        "p99_ms": float(p99),
+    }
+
+async def run_load_test(port, concurrency, duration):
+    # Run the server in its own process so client and server do not share an event loop
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--port", str(port)])
+    url = f"http://127.0.0.1:{port}"
+    try:
+        async with ClientSession() as session:
+            for _ in range(100):
+                try:
+                    async with session.get(f"{url}/health") as response:
+                        if response.status == 200:
+                            break
+                except OSError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("Server did not become ready.")
+        await asyncio.sleep(1.0)  # Let the synthetic feed fill the window
+        result = await load_test(url, concurrency, duration)
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait()
+
+    print(f"Requests: {result['requests']} ({result['errors']} errors) in {duration:.0f}s")
+    print(f"Throughput: {result['requests_per_second']:.0f} requests/sec")
+    print(f"Latency: p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Token analysis API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, help="Analysis thread pool size")
+    parser.add_argument("--replay", metavar="DIR", help="Serve analyses over a recorded event log")
+    parser.add_argument("--anomaly-db", metavar="PATH", help="SQLite file persisting detected anomalies")
+    parser.add_argument("--loadtest", action="store_true", help="Start a local server and load-test it")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent load-test clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Load-test duration in seconds")
+    args = parser.parse_args()
+
+    if args.loadtest:
+        asyncio.run(run_load_test(args.port, args.concurrency, args.duration))
+    else:
+        asyncio.run(serve(args.host, args.port, args.replay, args.workers, args.anomaly_db))
@@ -1,17 +1,367 @@
+import bisect
+import re
+import sys
+import time
+from collections import Counter, OrderedDict
+import numpy as np
+import pandas as pd
+
+# Batch checks report one bit per checked field, so a batch can check at most 64 fields
+MAX_BATCH_FIELDS = 64
+
+def _as_frame(data):
+    """
+    Accepts a DataFrame or a NumPy structured array (e.g. TRANSACTION_DTYPE records).
+    """
+    return data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+
+def _batch_fields(fields):
+    fields = list(fields)
+    if len(fields) > MAX_BATCH_FIELDS:
+        raise ValueError(f"Batch checks support at most {MAX_BATCH_FIELDS} fields, got {len(fields)}.")
+    return fields
+
+def _set_bits(mask, failed, bit):
+    mask |= failed.astype(np.uint64) << np.uint64(bit)
+
+def _row_examples(frame, failed):
+    rows = np.flatnonzero(failed)
+    return LazyExamples(len(rows), lambda i: frame.iloc[rows[i]].to_dict())
+
+def fields_in_mask(mask_value, fields):
+    """
+    Decodes one row's issue bitmask into the names of the offending fields.
+    """
+    return [field for bit, field in enumerate(fields) if int(mask_value) >> bit & 1]
+
+# Vectorized validity rules for check_validity_batch: each takes a column and returns a boolean mask
+def in_range(low=None, high=None):
+    def rule(column):
+        values = pd.to_numeric(column, errors="coerce")
+        valid = values.notna()
+        if low is not None:
+            valid &= values >= low
+        if high is not None:
+            valid &= values <= high
+        return valid.to_numpy()
+    return rule
+
+def has_dtype(kind):
+    """
+    Checks that values have a NumPy dtype kind, e.g. "i" (int), "f" (float), "b" (bool) or "U" (str).
+    """
+    def rule(column):
+        if column.dtype != object:
+            return np.full(len(column), column.dtype.kind == kind or (kind == "f" and column.dtype.kind == "i"))
+        return column.map(lambda value: np.asarray(value).dtype.kind == kind).to_numpy(dtype=bool)
+    return rule
+
+def matches(pattern):
+    def rule(column):
+        return column.astype("string").str.fullmatch(pattern).fillna(False).to_numpy(dtype=bool)
+    return rule
+
+NUMBER_TYPES = (int, float, np.integer, np.floating)
+FLOAT_TYPES = (float, np.floating)
+
+# Python types accepted by the "type" rule of a validation spec
+RULE_TYPES = {
+    "int": (int, np.integer),
+    "float": NUMBER_TYPES,
+    "number": NUMBER_TYPES,
+    "str": str,
+    "bool": (bool, np.bool_),
+}
+
+# NumPy dtype kinds that satisfy the "type" rule without checking values one by one
+RULE_DTYPE_KINDS = {"int": "iu", "float": "iuf", "number": "iuf", "str": "US", "bool": "b"}
+
+# Types whose values pass "range" checks without a further number guard
+NUMERIC_RULE_TYPES = ("int", "float", "number")
+
+def _is_instance(value, types):
+    # bool subclasses int, but True and False only satisfy the "bool" type
+    return isinstance(value, types) and (types is RULE_TYPES["bool"] or not isinstance(value, bool))
+
+def _is_int(value):
+    # Integral floats count as ints, since pandas loads int columns with nulls as float64
+    if isinstance(value, FLOAT_TYPES):
+        return bool(np.isfinite(value)) and float(value).is_integer()
+    return _is_instance(value, RULE_TYPES["int"])
+
+def _values_of_type(column, types, kinds):
+    """
+    Boolean mask of the values that are instances of `types`; columns whose dtype
+    kind is in `kinds` pass as a whole.
+    """
+    if column.dtype.kind in kinds:
+        return np.ones(len(column), dtype=bool)
+    if column.dtype == object or pd.api.types.is_string_dtype(column.dtype):
+        check = _is_instance if issubclass(bool, types) else isinstance
+        return column.map(lambda value: check(value, types)).to_numpy(dtype=bool)
+    return np.zeros(len(column), dtype=bool)
+
+class CompiledValidator:
+    def __init__(self, spec):
+        """
+        Validator compiled once from a declarative rule spec.
+
+        The spec maps each field to its rules, for example:
+            {"amount": {"type": "float", "range": (0, None), "not_null": True},
+             "token": {"enum": ["SOL", "BONK"]},
+             "wallet": {"regex": r"0x[0-9a-fA-F]+", "length": (3, 44)}}
+
+        Single records are checked by one generated function with every rule inlined.
+        Batches are checked with the equivalent vectorized pandas/NumPy operations.
+        Both return a bitmask with bit i set when the i-th field of the spec is invalid.
+        Missing values (None or NaN) only fail fields marked "not_null". A value of the
+        wrong type for a rule, such as a number checked against a regex, is invalid.
+
+        :param spec: Mapping of field name to a dict of rules (type, range, enum, regex, length, not_null).
+        :raises ValueError: If the spec has more than MAX_BATCH_FIELDS fields.
+        """
+        self.spec = {field: dict(rules) for field, rules in spec.items()}
+        self.fields = _batch_fields(self.spec)
+        self.patterns = {field: re.compile(rules["regex"]) for field, rules in self.spec.items() if "regex" in rules}
+        self.validate = self._compile()
+
+    def _compile(self):
+        constants = {}
+        def constant(value):
+            name = f"_c{len(constants)}"
+            constants[name] = value
+            return name
+
+        lines = ["def validate(record):", "    invalid = 0", "    get = record.get"]
+        for bit, field in enumerate(self.fields):
+            rules = self.spec[field]
+            # Checks that need a number or a string are guarded, unless the type rule already
+            # is, so values of the wrong type fail instead of raising
+            # bool subclasses int, so numeric checks rule out True and False explicitly
+            rule_type = rules.get("type")
+            not_bool = "value is not True and value is not False"
+            checks = []
+            if rule_type == "int":
+                checks.append(f"({not_bool} and isinstance(value, {constant(RULE_TYPES['int'])}) "
+                              f"or isinstance(value, {constant(FLOAT_TYPES)}) and value.is_integer())")
+            elif rule_type in NUMERIC_RULE_TYPES:
+                checks.append(f"{not_bool} and isinstance(value, {constant(RULE_TYPES[rule_type])})")
+            elif rule_type is not None:
+                checks.append(f"isinstance(value, {constant(RULE_TYPES[rule_type])})")
+            if "range" in rules:
+                low, high = rules["range"]
+                if rule_type not in NUMERIC_RULE_TYPES:
+                    checks.append(f"{not_bool} and isinstance(value, {constant(NUMBER_TYPES)})")
+                if low is not None:
+                    checks.append(f"value >= {constant(low)}")
+                if high is not None:
+                    checks.append(f"value <= {constant(high)}")
+            if "enum" in rules:
+                checks.append(f"value.__hash__ is not None and value in {constant(frozenset(rules['enum']))}")
+            if ("length" in rules or "regex" in rules) and rule_type != "str":
+                checks.append("isinstance(value, str)")
+            if "length" in rules:
+                low, high = rules["length"]
+                checks.append(f"{constant(low or 0)} <= len(value) <= {constant(high if high is not None else sys.maxsize)}")
+            if "regex" in rules:
+                checks.append(f"{constant(self.patterns[field].fullmatch)}(value) is not None")
+
+            lines.append(f"    value = get({field!r})")
+            # NaN is the only value unequal to itself
+            lines.append("    if value is None or value != value:")
+            lines.append(f"        invalid |= {1 << bit if rules.get('not_null') else 0}")
+            if checks:
+                lines.append(f"    elif not ({' and '.join(checks)}):")
+                lines.append(f"        invalid |= {1 << bit}")
+        lines.append("    return invalid")
+
+        namespace = dict(constants)
+        exec("\n".join(lines), namespace)
+        return namespace["validate"]
+
+    def validate_batch(self, data):
+        """
+        Validates every row of a DataFrame or structured array.
+
+        :return: uint64 array with bit i set where the i-th field of the spec is invalid.
+        """
+        frame = _as_frame(data)
+        mask = np.zeros(len(frame), dtype=np.uint64)
+        for bit, field in enumerate(self.fields):
+            rules = self.spec[field]
+            if field not in frame.columns:
+                if rules.get("not_null"):
+                    mask |= np.uint64(1 << bit)
+                continue
+            column = frame[field]
+            null = column.isna().to_numpy()
+            valid = np.ones(len(frame), dtype=bool)
+            if "type" in rules:
+                rule_type = rules["type"]
+                if column.dtype.kind in RULE_DTYPE_KINDS[rule_type]:
+                    pass
+                elif rule_type == "int" and column.dtype.kind == "f":
+                    values = column.to_numpy()
+                    with np.errstate(invalid="ignore"):
+                        valid &= np.isfinite(values) & (values == np.floor(values))
+                elif rule_type == "int" and column.dtype == object:
+                    valid &= column.map(_is_int).to_numpy(dtype=bool)
+                elif column.dtype == object or pd.api.types.is_string_dtype(column.dtype):
+                    valid &= _values_of_type(column, RULE_TYPES[rule_type], "")
+                else:
+                    valid[:] = False
+            if "range" in rules:
+                low, high = rules["range"]
+                if rules.get("type") in NUMERIC_RULE_TYPES:
+                    values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+                else:
+                    numeric = _values_of_type(column, NUMBER_TYPES, "iuf")
+                    values = np.where(numeric, pd.to_numeric(column.where(numeric), errors="coerce"), np.nan)
+                    valid &= numeric
+                if low is not None:
+                    valid &= values >= low
+                if high is not None:
+                    valid &= values <= high
+            if "enum" in rules:
+                valid &= column.isin(list(rules["enum"])).to_numpy()
+            if "length" in rules or "regex" in rules:
+                if rules.get("type") != "str":
+                    valid &= _values_of_type(column, str, "U")
+                strings = column.astype("string")
+                if "length" in rules:
+                    low, high = rules["length"]
+                    lengths = strings.str.len().to_numpy(dtype=float, na_value=np.nan)
+                    valid &= (lengths >= (low or 0)) & (lengths <= (high if high is not None else np.inf))
+                if "regex" in rules:
+                    valid &= strings.str.fullmatch(self.patterns[field].pattern).fillna(False).to_numpy(dtype=bool)
+            invalid = ~valid & ~null
+            if rules.get("not_null"):
+                invalid |= null
+            _set_bits(mask, invalid, bit)
+        return mask
+
+def compile_rules(spec):
+    """
+    Compiles a declarative rule spec into a CompiledValidator.
+    """
+    return CompiledValidator(spec)
+
+class LazyExamples:
+    def __init__(self, count, make_example):
+        """
+        Sequence of `count` offending records that are only built when sampled.
+        """
+        self.count = count
+        self.make_example = make_example
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.make_example(index)
+
+class IssueStore:
+    def __init__(self, sample_size=10, bucket_seconds=60, max_buckets=1440, random_state=None):
+        """
+        Constant-memory store of data quality issues.
+
+        Keeps a counter per (check type, field), a reservoir sample of at most
+        `sample_size` offending records per key, and per-key counts for the last
+        `max_buckets` time buckets of `bucket_seconds` each. Issues timestamped before
+        the oldest retained bucket still count in totals and samples but not in rollups.
+
+        :param sample_size: Maximum number of example records kept per key.
+        :param bucket_seconds: Width of a rollup time bucket in seconds.
+        :param max_buckets: Number of most recent buckets kept for rollups.
+        :param random_state: Seed for the reservoir sampling.
+        """
+        self.sample_size = sample_size
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.rng = np.random.default_rng(random_state)
+        self.counts = Counter()
+        self.samples = {}
+        self.buckets = {}
+        self.bucket_keys = []  # Sorted keys of self.buckets, so backfilled buckets evict in time order
+
+    def add(self, check_type, field, examples, timestamp=None):
+        """
+        Records len(examples) issues of one kind.
+
+        :param examples: Sequence of offending records, e.g. a list or LazyExamples;
+                         only the items that enter the sample are read.
+        :param timestamp: Time the issues were observed; defaults to now.
+        """
+        key = (check_type, field)
+        count = len(examples)
+        seen = self.counts[key]
+        self.counts[key] = seen + count
+
+        bucket = int((time.time() if timestamp is None else timestamp) // self.bucket_seconds)
+        if bucket not in self.buckets:
+            full = len(self.bucket_keys) >= self.max_buckets
+            if not full or bucket > self.bucket_keys[0]:
+                self.buckets[bucket] = Counter()
+                bisect.insort(self.bucket_keys, bucket)
+                if full:
+                    del self.buckets[self.bucket_keys.pop(0)]
+        if bucket in self.buckets:
+            self.buckets[bucket][key] += count
+
+        # Reservoir sampling (Algorithm R), vectorized over the new issues
+        sample = self.samples.setdefault(key, [])
+        fill = min(self.sample_size - len(sample), count)
+        sample.extend(_snapshot(examples[i]) for i in range(fill))
+        if fill < count:
+            positions = np.arange(seen + fill + 1, seen + count + 1)
+            slots = (self.rng.random(len(positions)) * positions).astype(np.int64)
+            for i in np.flatnonzero(slots < self.sample_size):
+                sample[slots[i]] = _snapshot(examples[fill + i])
+
+    def rollup(self, since=None):
+        """
+        Returns issue counts per time bucket, oldest first, as (bucket_start, {key: count}).
+        """
+        start_bucket = -np.inf if since is None else since // self.bucket_seconds
+        first = bisect.bisect_left(self.bucket_keys, start_bucket)
+        return [(bucket * self.bucket_seconds, dict(self.buckets[bucket])) for bucket in self.bucket_keys[first:]]
+
+    def summary(self):
+        """
+        Returns total counts and example records grouped by check type and field.
+        """
+        counts, examples = {}, {}
+        for (check_type, field), count in self.counts.items():
+            counts.setdefault(check_type, {})[field] = count
+            examples.setdefault(check_type, {})[field] = list(self.samples.get((check_type, field), []))
+        return {"total": sum(self.counts.values()), "counts": counts, "examples": examples}
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+def _snapshot(example):
+    # Copy mappings so later changes to the caller's record do not alter the sample
+    return dict(example) if hasattr(example, "items") else example
+
 class DataQualityAssurance:
-    def __init__(self):
+    def __init__(self, issue_store=None):
         """
         Initializes the Data Quality Assurance system.
+
+        Records can be plain dicts or any mapping, including the compact Transaction
+        records from transactions.py.
+
+        :param issue_store: IssueStore collecting detected issues; a default one is created if omitted.
         """
-        self.issues = []
+        self.issues = issue_store if issue_store is not None else IssueStore()
     
     def check_completeness(self, data):
         """
         Checks if any fields in the data are missing.
         """
         missing_fields = [key for key, value in data.items() if value is None or value == ""]
-        if missing_fields:
-            self.issues.append({"type": "completeness", "missing_fields": missing_fields})
+        for field in missing_fields:
+            self.issues.add("completeness", field, [data])
         return not bool(missing_fields)
     
     def check_consistency(self, data1, data2, keys):
@@ -19,34 +369,295 @@ class DataQualityAssurance:
         Checks if values of specified keys are consistent between two datasets.
         """
         inconsistencies = {key: (data1.get(key), data2.get(key)) for key in keys if data1.get(key) != data2.get(key)}
-        if inconsistencies:
-            self.issues.append({"type": "consistency", "inconsistencies": inconsistencies})
+        for key, values in inconsistencies.items():
+            self.issues.add("consistency", key, [values])
         return not bool(inconsistencies)
     
     def check_validity(self, data, validation_rules):
         """
         Validates data based on provided validation rules (e.g., data type, range).
+
+        :param validation_rules: Mapping of field to a predicate, or a CompiledValidator.
         """
+        if isinstance(validation_rules, CompiledValidator):
+            invalid = validation_rules.validate(data)
+            if invalid:
+                for field in fields_in_mask(invalid, validation_rules.fields):
+                    self.issues.add("validity", field, [data])
+            return not invalid
         invalid_entries = {}
         for key, rule in validation_rules.items():
             if key in data and not rule(data[key]):
                 invalid_entries[key] = data[key]
-        if invalid_entries:
-            self.issues.append({"type": "validity", "invalid_entries": invalid_entries})
+        for key in invalid_entries:
+            self.issues.add("validity", key, [data])
         return not bool(invalid_entries)
     
+    def check_completeness_batch(self, data, fields=None):
+        """
+        Checks a whole batch for missing fields using column null masks.
+
+        :param data: DataFrame or structured array with one record per row.
+        :param fields: Fields to check; defaults to every column.
+        :return: uint64 array with bit i set where fields[i] is missing in that row.
+        """
+        frame = _as_frame(data)
+        fields = _batch_fields(frame.columns if fields is None else fields)
+        mask = np.zeros(len(frame), dtype=np.uint64)
+        for bit, field in enumerate(fields):
+            column = frame[field]
+            missing = column.isna().to_numpy()
+            if column.dtype == object or pd.api.types.is_string_dtype(column.dtype):
+                missing = missing | (column == "").to_numpy(dtype=bool)
+            if missing.any():
+                _set_bits(mask, missing, bit)
+                self.issues.add("completeness", field, _row_examples(frame, missing))
+        return mask
+
+    def check_consistency_batch(self, data1, data2, keys):
+        """
+        Compares two row-aligned batches column by column; two nulls count as equal.
+
+        :return: uint64 array with bit i set where keys[i] differs in that row.
+        """
+        frame1, frame2 = _as_frame(data1), _as_frame(data2)
+        keys = _batch_fields(keys)
+        mask = np.zeros(len(frame1), dtype=np.uint64)
+        for bit, key in enumerate(keys):
+            left, right = frame1[key].to_numpy(), frame2[key].to_numpy()
+            differs = (left != right) & ~(pd.isna(left) & pd.isna(right))
+            if differs.any():
+                _set_bits(mask, differs, bit)
+                rows = np.flatnonzero(differs)
+                self.issues.add("consistency", key, LazyExamples(len(rows), lambda i: (left[rows[i]], right[rows[i]])))
+        return mask
+
+    def check_validity_batch(self, data, validation_rules):
+        """
+        Validates a whole batch with vectorized rules such as in_range, has_dtype and matches.
+        Missing values are left to check_completeness_batch and are not flagged here, and
+        rules for fields absent from the batch are skipped.
+
+        :param validation_rules: Mapping of field to a rule taking a column and returning a boolean mask,
+                                 or a CompiledValidator.
+        :return: uint64 array with bit i set where the i-th rule's field is invalid in that row.
+        """
+        frame = _as_frame(data)
+        if isinstance(validation_rules, CompiledValidator):
+            mask = validation_rules.validate_batch(frame)
+            for bit, field in enumerate(validation_rules.fields):
+                invalid = (mask >> np.uint64(bit) & np.uint64(1)).astype(bool)
+                if invalid.any():
+                    self.issues.add("validity", field, _row_examples(frame, invalid))
+            return mask
+        fields = _batch_fields(validation_rules)
+        mask = np.zeros(len(frame), dtype=np.uint64)
+        for bit, field in enumerate(fields):
+            if field not in frame.columns:
+                continue
+            column = frame[field]
+            invalid = ~np.asarray(validation_rules[field](column), dtype=bool) & column.notna().to_numpy()
+            if invalid.any():
+                _set_bits(mask, invalid, bit)
+                self.issues.add("validity", field, _row_examples(frame, invalid))
+        return mask
+
     def report_issues(self):
         """
-        Returns a summary of detected data quality issues.
+        Returns a summary of detected data quality issues: counts and example records per check and field.
+        """
+        return self.issues.summary()
+
+class StreamingConsistencyChecker:
+    def __init__(self, keys, key_field="tx_id", sources=("primary", "secondary"),
+                 max_pending=100_000, timeout=60.0, issue_store=None):
         """
-        return self.issues
+        Reconciles two record streams by joining them on `key_field` as records arrive.
+
+        A record waits in its source's buffer until the other source delivers the same
+        key. The pair's `keys` fields are then compared and any mismatch is emitted.
+        A record that stays unmatched for `timeout` seconds, or is pushed out because
+        `max_pending` records are already waiting, is reported as unmatched. A record
+        replaced by a later one with the same key from the same source is reported as a
+        duplicate. Memory is therefore bounded by the out-of-order window, not by the
+        size of the streams.
+
+        :param keys: Fields that must agree between the two sources.
+        :param key_field: Field identifying the same record in both sources, e.g. the tx id.
+        :param sources: Names of the two sources.
+        :param max_pending: Maximum number of unmatched records buffered per source.
+        :param timeout: Seconds an unmatched record is kept before it is evicted.
+        :param issue_store: IssueStore receiving mismatches, unmatched and duplicate records.
+        """
+        self.keys = list(keys)
+        self.key_field = key_field
+        self.sources = tuple(sources)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.issues = issue_store if issue_store is not None else IssueStore()
+        # Insertion order is arrival order, so the oldest pending records are always first
+        self.pending = {source: OrderedDict() for source in self.sources}
+        self.matched = 0
+
+    def _other(self, source):
+        return self.sources[1] if source == self.sources[0] else self.sources[0]
+
+    def _evict(self, source, key, record):
+        self.issues.add("unmatched", source, [{"key": key, "record": record}])
+
+    def add(self, source, record, now=None):
+        """
+        Adds one record from `source`.
+
+        :param now: Arrival time in seconds; defaults to a monotonic clock.
+        :return: The mismatch found when this record completes a pair, otherwise None.
+        """
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+
+        key = record.get(self.key_field)
+        partner = self.pending[self._other(source)].pop(key, None)
+        if partner is None:
+            pending = self.pending[source]
+            displaced = pending.pop(key, None)
+            if displaced is not None:
+                self.issues.add("duplicate", source, [{"key": key, "record": displaced[1]}])
+            pending[key] = (now, record)
+            if len(pending) > self.max_pending:
+                old_key, (_, old_record) = pending.popitem(last=False)
+                self._evict(source, old_key, old_record)
+            return None
+
+        self.matched += 1
+        _, other_record = partner
+        first, second = (record, other_record) if source == self.sources[0] else (other_record, record)
+        inconsistencies = {field: (first.get(field), second.get(field))
+                           for field in self.keys if first.get(field) != second.get(field)}
+        if not inconsistencies:
+            return None
+        for field, values in inconsistencies.items():
+            self.issues.add("consistency", field, [{"key": key, "values": values}])
+        return {"key": key, "inconsistencies": inconsistencies}
+
+    def expire(self, now=None):
+        """
+        Evicts records that have waited longer than the timeout.
+
+        :return: Number of records evicted.
+        """
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        for source, pending in self.pending.items():
+            while pending:
+                key, (arrived, record) = next(iter(pending.items()))
+                if now - arrived < self.timeout:
+                    break
+                pending.popitem(last=False)
+                self._evict(source, key, record)
+                evicted += 1
+        return evicted
+
+    def flush(self):
+        """
+        Reports every still-pending record as unmatched, e.g. at the end of a reconciliation run.
+        """
+        return self.expire(now=float("inf"))
+
+    def pending_count(self):
+        return {source: len(pending) for source, pending in self.pending.items()}
+
+# Benchmark: compiled rules against per-field lambdas on realistic transaction records
+def benchmark_validation(num_records=200_000, seed=42):
+    rng = np.random.default_rng(seed)
+    tokens = ["SOL", "BONK", "JUP", "WIF", "PYTH"]
+    records = [
+        {
+            "tx_id": int(rng.integers(1, 1 << 40)),
+            "wallet": "0x" + "".join(rng.choice(list("0123456789abcdef"), 40)),
+            "token": tokens[rng.integers(len(tokens))] if rng.random() > 0.01 else "???",
+            "amount": float(rng.lognormal(8, 2)) if rng.random() > 0.01 else -1.0,
+            "timestamp": 1.7e9 + float(rng.random()) * 1e6,
+        }
+        for _ in range(num_records)
+    ]
+    wallet_pattern = re.compile(r"0x[0-9a-f]{40}")
+    token_set = set(tokens)
+    lambda_rules = {
+        "tx_id": lambda x: isinstance(x, int) and x > 0,
+        "wallet": lambda x: isinstance(x, str) and wallet_pattern.fullmatch(x) is not None,
+        "token": lambda x: x in token_set,
+        "amount": lambda x: isinstance(x, float) and 0 <= x <= 1e12,
+        "timestamp": lambda x: isinstance(x, float) and x >= 1.5e9,
+    }
+    validator = compile_rules({
+        "tx_id": {"type": "int", "range": (1, None), "not_null": True},
+        "wallet": {"type": "str", "regex": r"0x[0-9a-f]{40}", "not_null": True},
+        "token": {"enum": tokens},
+        "amount": {"type": "float", "range": (0, 1e12), "not_null": True},
+        "timestamp": {"type": "float", "range": (1.5e9, None)},
+    })
+    frame = pd.DataFrame(records)
+
+    checker = DataQualityAssurance()
+    results = {}
+    for name, run in [
+        ("lambda rules, per record", lambda: [checker.check_validity(r, lambda_rules) for r in records]),
+        ("compiled rules, per record", lambda: [checker.check_validity(r, validator) for r in records]),
+        ("compiled rules, batch", lambda: checker.check_validity_batch(frame, validator)),
+    ]:
+        start = time.perf_counter()
+        run()
+        results[name] = time.perf_counter() - start
+    for name, elapsed in results.items():
+        print(f"{name:<30} {elapsed * 1000:9.1f} ms  {num_records / elapsed:>14,.0f} records/s")
+    return results
 
 # Example Usage
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_validation()
+        sys.exit(0)
+
     data_checker = DataQualityAssurance()
     sample_data = {"name": "Alice", "age": "25", "email": ""}
     
     data_checker.check_completeness(sample_data)
     data_checker.check_validity(sample_data, {"age": lambda x: x.isdigit()})
     
+    # Batch checks over a whole ingestion batch at once
+    batch = pd.DataFrame({
+        "wallet": ["0xABC", "", "0xDEF", None],
+        "amount": [600000, -5, 200000, 100000],
+        "token": ["SOL", "BONK", "bad token", "JUP"],
+    })
+    validity_rules = {"amount": in_range(0, None), "token": matches(r"[A-Z]+")}
+    missing = data_checker.check_completeness_batch(batch)
+    invalid = data_checker.check_validity_batch(batch, validity_rules)
+    for row in np.flatnonzero(missing | invalid):
+        print(row, fields_in_mask(missing[row], list(batch.columns)), fields_in_mask(invalid[row], list(validity_rules)))
+    
+    # Declarative rules compiled once, used for single records and batches alike
+    validator = compile_rules({
+        "amount": {"type": "number", "range": (0, None), "not_null": True},
+        "token": {"type": "str", "regex": r"[A-Z]+", "length": (1, 10)},
+    })
+    data_checker.check_validity({"amount": -1, "token": "SOL"}, validator)
+    data_checker.check_validity_batch(batch, validator)
+
+    # Both paths must flag the same fields, including for bools, NaN and wrongly typed values
+    parity_records = [{"amount": True, "token": "SOL"}, {"amount": 1.5, "token": 5},
+                      {"amount": float("nan"), "token": "sol"}, {"amount": "abc", "token": None}]
+    single = [validator.validate(record) for record in parity_records]
+    assert single == validator.validate_batch(pd.DataFrame(parity_records)).tolist(), single
+    bools = pd.DataFrame({"amount": [True, False], "token": ["SOL", "JUP"]})
+    assert [validator.validate(record) for record in bools.to_dict("records")] == validator.validate_batch(bools).tolist()
+
+    # Reconcile two providers' streams record by record as they arrive
+    reconciler = StreamingConsistencyChecker(keys=["amount", "wallet"], issue_store=data_checker.issues, timeout=30)
+    reconciler.add("primary", {"tx_id": 1, "wallet": "0xABC", "amount": 600000}, now=0)
+    reconciler.add("primary", {"tx_id": 2, "wallet": "0xDEF", "amount": 200000}, now=1)
+    print(reconciler.add("secondary", {"tx_id": 2, "wallet": "0xDEF", "amount": 250000}, now=2))
+    reconciler.add("secondary", {"tx_id": 3, "wallet": "0xXYZ", "amount": 100000}, now=40)  # tx 1 times out
+    reconciler.flush()
+    
     print(data_checker.report_issues())
@@ -0,0 +1,172 @@
+import glob
+import json
+import os
+import numpy as np
+from transactions import TRANSACTION_DTYPE, tokens, wallets
+
+SEGMENT_SUFFIX = ".seg"
+
+class EventLogWriter:
+    def __init__(self, log_dir, segment_records=1 << 20, buffer_records=4096):
+        """
+        Append-only transaction log made of fixed-size binary segments.
+
+        Segments hold raw TRANSACTION_DTYPE records and are named after the sequence
+        number of their first record, so they can be memory-mapped for replay without
+        parsing. The wallet and token intern tables are appended to text files next to
+        the segments. Replay can then restore the exact ids that were used when recording.
+
+        :param log_dir: Directory holding the segments; created if missing.
+        :param segment_records: Number of records per segment before rolling to a new one.
+        :param buffer_records: Number of single appended events buffered before a write.
+        """
+        self.log_dir = log_dir
+        self.segment_records = segment_records
+        os.makedirs(log_dir, exist_ok=True)
+
+        meta_file = os.path.join(log_dir, "meta.json")
+        if not os.path.exists(meta_file):
+            with open(meta_file, "w") as f:
+                json.dump({"dtype": TRANSACTION_DTYPE.descr}, f)
+
+        # Resume after the last complete record of the newest segment
+        segments = sorted(glob.glob(os.path.join(log_dir, f"*{SEGMENT_SUFFIX}")))
+        if segments:
+            last = segments[-1]
+            records_in_last = os.path.getsize(last) // TRANSACTION_DTYPE.itemsize
+            os.truncate(last, records_in_last * TRANSACTION_DTYPE.itemsize)
+            self.segment_start = int(os.path.basename(last)[:-len(SEGMENT_SUFFIX)])
+            self.segment_fill = records_in_last
+        else:
+            self.segment_start = 0
+            self.segment_fill = 0
+        self.segment = None
+
+        self.intern_files = {
+            "wallets": (wallets, os.path.join(log_dir, "wallets.txt")),
+            "tokens": (tokens, os.path.join(log_dir, "tokens.txt")),
+        }
+        # Ids in existing segments must keep meaning the same addresses in this process
+        self.interned_written = {}
+        for name, (table, path) in self.intern_files.items():
+            ids = _load_intern_table(table, path)
+            if not np.array_equal(ids, np.arange(len(ids))):
+                raise ValueError(f"{log_dir} was recorded with different intern ids; "
+                                 "open it before interning any addresses.")
+            self.interned_written[name] = len(ids)
+
+        self.buffer = np.empty(buffer_records, dtype=TRANSACTION_DTYPE)
+        self.buffered = 0
+
+    def _open_segment(self):
+        path = os.path.join(self.log_dir, f"{self.segment_start:020d}{SEGMENT_SUFFIX}")
+        self.segment = open(path, "ab")
+
+    def _write_interned(self):
+        # Persist intern table entries added since the last write, in id order
+        for name, (table, path) in self.intern_files.items():
+            written = self.interned_written[name]
+            if len(table) > written:
+                with open(path, "a") as f:
+                    f.write("".join(f"{value}\n" for value in table.values[written:]))
+                self.interned_written[name] = len(table)
+
+    def write(self, records):
+        """
+        Appends a TRANSACTION_DTYPE batch, rolling segments as they fill up.
+        """
+        self._flush_buffer()
+        self._write_records(records)
+
+    def _write_records(self, records):
+        self._write_interned()
+        while len(records):
+            if self.segment is None:
+                self._open_segment()
+            room = self.segment_records - self.segment_fill
+            chunk, records = records[:room], records[room:]
+            self.segment.write(chunk.tobytes())
+            self.segment_fill += len(chunk)
+            if self.segment_fill == self.segment_records:
+                self.segment.close()
+                self.segment = None
+                self.segment_start += self.segment_records
+                self.segment_fill = 0
+
+    def append(self, transaction):
+        """
+        Buffers a single Transaction; it is written once the buffer is full or on flush().
+        """
+        self.buffer[self.buffered] = (transaction.tx_id, transaction.wallet_id, transaction.token_id,
+                                      transaction.amount, transaction.timestamp)
+        self.buffered += 1
+        if self.buffered == len(self.buffer):
+            self._flush_buffer()
+
+    def _flush_buffer(self):
+        if self.buffered:
+            self._write_records(self.buffer[:self.buffered])
+            self.buffered = 0
+
+    def flush(self):
+        self._flush_buffer()
+        if self.segment is not None:
+            self.segment.flush()
+
+    def close(self):
+        self.flush()
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
+
+class EventLogReader:
+    def __init__(self, log_dir):
+        """
+        Memory-maps the segments of an event log for replay.
+
+        Logged wallet and token ids are translated to this process's intern tables.
+        A fresh process that reads the log before interning anything gets identical
+        ids, so batches are passed through as zero-copy views.
+        """
+        self.log_dir = log_dir
+        self.segment_paths = sorted(glob.glob(os.path.join(log_dir, f"*{SEGMENT_SUFFIX}")))
+        self.id_maps = {
+            "wallet": _load_intern_table(wallets, os.path.join(log_dir, "wallets.txt")),
+            "token": _load_intern_table(tokens, os.path.join(log_dir, "tokens.txt")),
+        }
+        self.identity_ids = all(np.array_equal(ids, np.arange(len(ids))) for ids in self.id_maps.values())
+
+    def segments(self):
+        """
+        Yields each segment as a read-only memory-mapped record array.
+        """
+        for path in self.segment_paths:
+            num_records = os.path.getsize(path) // TRANSACTION_DTYPE.itemsize
+            if num_records:
+                yield np.memmap(path, dtype=TRANSACTION_DTYPE, mode="r", shape=(num_records,))
+
+    def batches(self, batch_size):
+        """
+        Yields record batches of at most `batch_size` events in log order.
+        """
+        for segment in self.segments():
+            for start in range(0, len(segment), batch_size):
+                batch = segment[start:start + batch_size]
+                if not self.identity_ids:
+                    batch = np.array(batch)
+                    for field, ids in self.id_maps.items():
+                        batch[field] = ids[batch[field]]
+                yield batch
+
+    def __len__(self):
+        return sum(os.path.getsize(path) // TRANSACTION_DTYPE.itemsize for path in self.segment_paths)
+
+def _load_intern_table(table, path):
+    """
+    Interns every logged value and returns an array mapping logged ids to local ids.
+    """
+    if not os.path.exists(path):
+        return np.empty(0, dtype=np.uint32)
+    with open(path) as f:
+        values = f.read().splitlines()
+    return np.array([table.intern(value) for value in values], dtype=np.uint32)
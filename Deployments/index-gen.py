@@ -1,7 +1,60 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
+class RunningColumnStats:
+    def __init__(self, num_columns):
+        """
+        Running per-column count, sum, min and max, ignoring missing values.
+
+        :param num_columns: Number of columns tracked.
+        """
+        self.count = np.zeros(num_columns)
+        self.sum = np.zeros(num_columns)
+        self.min = np.full(num_columns, np.inf)
+        self.max = np.full(num_columns, -np.inf)
+
+    def update(self, values):
+        """
+        Folds a (rows x columns) block of new values into the statistics.
+        """
+        present = ~np.isnan(values)
+        self.count += present.sum(axis=0)
+        self.sum += np.where(present, values, 0).sum(axis=0)
+        if len(values):
+            self.min = np.fmin(self.min, np.nanmin(np.where(present, values, np.inf), axis=0))
+            self.max = np.fmax(self.max, np.nanmax(np.where(present, values, -np.inf), axis=0))
+
+    def merge(self, other):
+        """
+        Combines statistics computed over disjoint row ranges.
+        """
+        self.count += other.count
+        self.sum += other.sum
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum / self.count
+
+    def scale(self, values):
+        """
+        Fills missing values with the running mean and min-max scales with the running range.
+        Constant columns scale to 0, as with MinMaxScaler.
+        """
+        values = np.where(np.isnan(values), self.mean, values)
+        value_range = self.max - self.min
+        value_range[value_range == 0] = 1
+        values -= self.min
+        values /= value_range
+        return values
+
 class IndexGenerationPipeline:
     def __init__(self, data_sources, weights=None):
         """
@@ -14,9 +67,25 @@ class IndexGenerationPipeline:
         self.weights = weights if weights else np.ones(len(data_sources)) / len(data_sources)
 
         # Normalize weights to sum to 1
-        self.weights = np.array(self.weights)
+        self.weights = np.array(self.weights, dtype=float)
         self.weights /= self.weights.sum()
 
+        # State of the incremental mode, created by the first update_index call
+        self.stats = None
+        self.index_chunks = []
+
+    def column_weights(self, data_sources):
+        """
+        Spreads each source's weight evenly over its columns, so that the weighted mean
+        of per-source row averages becomes a single matrix-vector product.
+
+        :param data_sources: List of DataFrames, one per source.
+        :return: Weight vector with one entry per column of the concatenated sources.
+        """
+        return np.concatenate([
+            np.full(data.shape[1], weight / data.shape[1]) for data, weight in zip(data_sources, self.weights)
+        ])
+
     def handle_missing_values(self, data):
         """
         Handles missing values by filling them with the mean value of the column.
@@ -59,14 +128,9 @@ class IndexGenerationPipeline:
         :param processed_data: List of processed data DataFrames.
         :return: Composite index.
         """
-        # Initialize the composite index with zeros
-        index = np.zeros(processed_data[0].shape[0])
-
-        # Aggregate data sources using their weights
-        for i, data in enumerate(processed_data):
-            index += data.mean(axis=1) * self.weights[i]
-
-        return index
+        # Concatenate all sources into one matrix and aggregate with one matrix-vector product
+        matrix = np.hstack([data.to_numpy(dtype=float) for data in processed_data])
+        return matrix @ self.column_weights(processed_data)
 
     def validate_index(self, index):
         """
@@ -100,6 +164,174 @@ class IndexGenerationPipeline:
             print("Invalid index detected.")
             return None
 
+    def update_index(self, new_rows):
+        """
+        Incremental mode: appends new rows and computes the index for those rows only.
+
+        Running per-column min, max and mean replace refitting on the full history.
+        New rows are filled and scaled with statistics that include them, and index
+        values already produced are kept as they are.
+
+        :param new_rows: List of DataFrames with the new rows, one per source, in the same order as data_sources.
+        :return: Composite index values for the new rows.
+        """
+        matrix = np.hstack([data.to_numpy(dtype=float) for data in new_rows])
+        if self.stats is None:
+            self.stats = RunningColumnStats(matrix.shape[1])
+            self.incremental_weights = self.column_weights(new_rows)
+        self.stats.update(matrix)
+
+        new_index = self.stats.scale(matrix) @ self.incremental_weights
+        self.index_chunks.append(new_index)
+        return new_index
+
+    def index_history(self):
+        """
+        Returns every index value produced in incremental mode, oldest first.
+        """
+        return np.concatenate(self.index_chunks) if self.index_chunks else np.empty(0)
+
+def iter_source_chunks(source, chunk_rows, row_range=None):
+    """
+    Reads a data source in blocks of at most `chunk_rows` rows.
+
+    :param source: Path to a .parquet, .csv or .npy file; .npy files are memory-mapped.
+    :param chunk_rows: Maximum number of rows per block.
+    :param row_range: Optional (start, stop) rows to read; only supported for .npy sources.
+    :return: Iterator of float arrays of shape (rows, columns).
+    """
+    path = os.fspath(source)
+    if path.endswith(".npy"):
+        array = np.load(path, mmap_mode="r")
+        start, stop = row_range or (0, len(array))
+        for chunk_start in range(start, stop, chunk_rows):
+            yield np.array(array[chunk_start:min(chunk_start + chunk_rows, stop)], dtype=float, ndmin=2)
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas().to_numpy(dtype=float)
+    elif path.endswith(".csv"):
+        for frame in pd.read_csv(path, chunksize=chunk_rows):
+            yield frame.to_numpy(dtype=float)
+    else:
+        raise ValueError(f"Unsupported data source format: {path}")
+
+def source_stats(source, chunk_rows, row_range=None):
+    """
+    Pass 1: column statistics and row count of a source, or of a row range of it.
+    """
+    stats, rows = None, 0
+    for chunk in iter_source_chunks(source, chunk_rows, row_range):
+        if stats is None:
+            stats = RunningColumnStats(chunk.shape[1])
+        stats.update(chunk)
+        rows += len(chunk)
+    return stats, rows
+
+def source_contribution(source, stats, column_weights, chunk_rows, output_path, row_range=None):
+    """
+    Pass 2: scales a source chunk by chunk and writes its weighted share of the index
+    into the rows of the `output_path` .npy file that `row_range` covers.
+    """
+    output = np.load(output_path, mmap_mode="r+")
+    position = row_range[0] if row_range else 0
+    for chunk in iter_source_chunks(source, chunk_rows, row_range):
+        output[position:position + len(chunk)] = stats.scale(chunk) @ column_weights
+        position += len(chunk)
+    output.flush()
+
+class ChunkedIndexGenerationPipeline:
+    def __init__(self, data_sources, weights=None, chunk_rows=1_000_000, max_workers=None):
+        """
+        Out-of-core variant of IndexGenerationPipeline for sources too large for memory.
+
+        Sources are read in chunks from Parquet, CSV or memory-mapped .npy files in two
+        passes: one collects per-column statistics, the other scales the chunks and
+        writes each source's weighted contribution to a memory-mapped file. Sources are
+        processed in parallel on a process pool; .npy sources are also split into row
+        ranges, so a single large source is spread over several workers. At most one
+        chunk per worker is held in memory at a time.
+
+        :param data_sources: Paths of the data sources; all must have the same number of rows.
+        :param weights: Weights to assign to each data source in the final index (if applicable).
+        :param chunk_rows: Number of rows read at once.
+        :param max_workers: Size of the process pool; defaults to the number of CPUs.
+        """
+        self.data_sources = [os.fspath(source) for source in data_sources]
+        self.weights = np.array(weights if weights else np.ones(len(data_sources)), dtype=float)
+        self.weights /= self.weights.sum()
+        self.chunk_rows = chunk_rows
+        self.max_workers = max_workers or os.cpu_count()
+
+    def _row_ranges(self, source):
+        # Only memory-mapped sources support random access; the rest are read sequentially
+        if not source.endswith(".npy"):
+            return [None]
+        num_rows = len(np.load(source, mmap_mode="r"))
+        step = max(self.chunk_rows, -(-num_rows // self.max_workers))
+        return [(start, min(start + step, num_rows)) for start in range(0, num_rows, step)] or [None]
+
+    def generate_index(self, output_path=None):
+        """
+        Generate the composite index with bounded memory.
+
+        :param output_path: Optional .npy path for the index; it is kept in memory if omitted.
+        :return: The final composite index (memory-mapped when output_path is given), or None if invalid.
+        """
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool, \
+                tempfile.TemporaryDirectory(prefix="index-") as workdir:
+            # Pass 1: statistics per source, merged over its row ranges
+            ranges = [self._row_ranges(source) for source in self.data_sources]
+            stats_futures = [[pool.submit(source_stats, source, self.chunk_rows, row_range) for row_range in source_ranges]
+                             for source, source_ranges in zip(self.data_sources, ranges)]
+            all_stats, num_rows = [], set()
+            for futures in stats_futures:
+                results = [future.result() for future in futures]
+                stats = results[0][0]
+                for other, _ in results[1:]:
+                    stats.merge(other)
+                all_stats.append(stats)
+                num_rows.add(sum(rows for _, rows in results))
+            if len(num_rows) != 1:
+                raise ValueError("All data sources must have the same number of rows.")
+            num_rows = num_rows.pop()
+
+            # Pass 2: scale and write each source's weighted contribution
+            contribution_paths = []
+            pass2_futures = []
+            for i, (source, stats, weight) in enumerate(zip(self.data_sources, all_stats, self.weights)):
+                path = os.path.join(workdir, f"contribution_{i}.npy")
+                np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(num_rows,)).flush()
+                contribution_paths.append(path)
+                column_weights = np.full(len(stats.count), weight / len(stats.count))
+                pass2_futures += [pool.submit(source_contribution, source, stats, column_weights,
+                                              self.chunk_rows, path, row_range) for row_range in ranges[i]]
+            for future in pass2_futures:
+                future.result()
+
+            # Sum the contributions chunk by chunk and validate as we go
+            if output_path is not None:
+                index = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float64, shape=(num_rows,))
+            else:
+                index = np.zeros(num_rows)
+            contributions = [np.load(path, mmap_mode="r") for path in contribution_paths]
+            valid = True
+            for start in range(0, num_rows, self.chunk_rows):
+                stop = min(start + self.chunk_rows, num_rows)
+                block = index[start:stop]
+                for contribution in contributions:
+                    block += contribution[start:stop]
+                valid &= not (np.any(block < 0) or np.any(block > 1))
+            del contributions
+
+        if not valid:
+            print("Index validation failed: Values are out of bounds.")
+            print("Invalid index detected.")
+            return None
+        if output_path is not None:
+            index.flush()
+        return index
+
 # Example usage
 
 # Example DataFrames representing different data sources (e.g., economic factors, market performance)
@@ -137,3 +369,28 @@ composite_index = index_pipeline.generate_index()
 if composite_index is not None:
     print("Generated Composite Index:")
     print(composite_index)
+
+# Incremental mode: each new block appends rows and only those rows are indexed
+incremental_pipeline = IndexGenerationPipeline([], weights)
+incremental_pipeline.update_index(data_sources)
+new_block = [
+    pd.DataFrame({'factor_1': [0.45], 'factor_2': [0.25], 'factor_3': [0.35]}),
+    pd.DataFrame({'factor_4': [0.55], 'factor_5': [None], 'factor_6': [0.45]}),
+    pd.DataFrame({'factor_7': [0.55], 'factor_8': [0.55], 'factor_9': [0.25]}),
+]
+print("Index for new block:", incremental_pipeline.update_index(new_block))
+
+# Chunked mode: the same sources read from disk with bounded memory
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as source_dir:
+        source_paths = [
+            os.path.join(source_dir, "source_1.csv"),
+            os.path.join(source_dir, "source_2.npy"),
+            os.path.join(source_dir, "source_3.csv"),
+        ]
+        data_source_1.to_csv(source_paths[0], index=False)
+        np.save(source_paths[1], data_source_2.to_numpy())
+        data_source_3.to_csv(source_paths[2], index=False)
+
+        chunked_pipeline = ChunkedIndexGenerationPipeline(source_paths, weights, chunk_rows=2, max_workers=2)
+        print("Chunked Composite Index:", chunked_pipeline.generate_index())
@@ -1,7 +1,7 @@
 import numpy as np
 import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Attention
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import LSTM, Dense, Dropout, Attention, Input
 from tensorflow.keras.optimizers import Adam
 
 # Generate synthetic time series data
@@ -12,17 +12,146 @@ def generate_data(sequence_length=50, num_samples=1000):
 
 # Build LSTM model with attention mechanism
 def build_lstm_model(input_shape):
-    model = Sequential([
-        LSTM(64, return_sequences=True, input_shape=input_shape),
-        Attention(),  # Applying attention for enhanced feature extraction
-        Dropout(0.2),
-        LSTM(32, return_sequences=False),
-        Dense(1, activation='linear')  # Output layer for regression
-    ])
+    inputs = Input(shape=input_shape)
+    hidden = LSTM(64, return_sequences=True)(inputs)
+    # Causal self-attention for enhanced feature extraction; each step only sees the past,
+    # so StatefulLSTMInference can reproduce the model one tick at a time
+    attended = Attention()([hidden, hidden], use_causal_mask=True)
+    x = Dropout(0.2)(attended)
+    x = LSTM(32, return_sequences=False)(x)
+    outputs = Dense(1, activation='linear')(x)  # Output layer for regression
+    model = Model(inputs, outputs)
     
     model.compile(loss='mse', optimizer=Adam(learning_rate=0.001), metrics=['mae'])
     return model
 
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+# Stateful per-token inference on a trained build_lstm_model network
+class StatefulLSTMInference:
+    def __init__(self, model, max_tokens, window_size=50):
+        """
+        Runs a trained build_lstm_model network one timestep at a time, carrying the
+        LSTM hidden and cell state of every token between ticks.
+
+        The recurrent state is kept in batched arrays indexed by a token's slot, so a
+        tick costs one timestep of compute for each token instead of a full sequence.
+        The attention layer attends causally over the last `window_size` outputs of the
+        first LSTM, which are cached per token in a ring buffer. Predictions match the
+        full-sequence model on a token's history while it fits within `window_size`.
+
+        :param model: Trained Keras model returned by build_lstm_model.
+        :param max_tokens: Maximum number of tokens tracked at once.
+        :param window_size: Number of past timesteps the attention layer can see.
+        """
+        lstm_layers = [layer for layer in model.layers if isinstance(layer, LSTM)]
+        dense_layer = [layer for layer in model.layers if isinstance(layer, Dense)][-1]
+
+        # Keras stores LSTM gates in (input, forget, cell, output) order
+        self.cells = [layer.get_weights() for layer in lstm_layers]
+        self.dense_kernel, self.dense_bias = dense_layer.get_weights()
+
+        self.max_tokens = max_tokens
+        self.window_size = window_size
+        self.token_slots = {}
+        self.free_slots = list(range(max_tokens - 1, -1, -1))
+
+        units = [kernel.shape[1] // 4 for kernel, _, _ in self.cells]
+        self.hidden = [np.zeros((max_tokens, n), dtype=np.float32) for n in units]
+        self.cell_state = [np.zeros((max_tokens, n), dtype=np.float32) for n in units]
+
+        # Ring buffer of first-layer outputs used as attention keys and values
+        self.attention_cache = np.zeros((max_tokens, window_size, units[0]), dtype=np.float32)
+        self.cache_position = np.zeros(max_tokens, dtype=np.int64)
+        self.steps_seen = np.zeros(max_tokens, dtype=np.int64)
+
+    def _slots_for(self, token_ids):
+        """
+        Maps token ids to state slots, allocating slots for new tokens.
+        """
+        slots = np.empty(len(token_ids), dtype=np.int64)
+        for i, token_id in enumerate(token_ids):
+            slot = self.token_slots.get(token_id)
+            if slot is None:
+                if not self.free_slots:
+                    raise RuntimeError("No free state slots left; release idle tokens first.")
+                slot = self.free_slots.pop()
+                self.token_slots[token_id] = slot
+            slots[i] = slot
+        return slots
+
+    def _lstm_step(self, layer, x, slots):
+        """
+        Advances one LSTM layer by a single timestep for the given slots.
+        """
+        kernel, recurrent_kernel, bias = self.cells[layer]
+        h = self.hidden[layer][slots]
+        c = self.cell_state[layer][slots]
+
+        z = x @ kernel + h @ recurrent_kernel + bias
+        i, f, g, o = np.split(z, 4, axis=1)
+        c = _sigmoid(f) * c + _sigmoid(i) * np.tanh(g)
+        h = _sigmoid(o) * np.tanh(c)
+
+        self.hidden[layer][slots] = h
+        self.cell_state[layer][slots] = c
+        return h
+
+    def _attend(self, query, slots):
+        """
+        Dot-product attention of the newest step over each token's cached window.
+        """
+        position = self.cache_position[slots]
+        self.attention_cache[slots, position] = query
+        self.cache_position[slots] = (position + 1) % self.window_size
+        self.steps_seen[slots] += 1
+
+        values = self.attention_cache[slots]
+        scores = np.einsum("bd,bwd->bw", query, values)
+        # Mask slots of the ring buffer that have not been written yet
+        filled = np.arange(self.window_size)[None, :] < self.steps_seen[slots][:, None]
+        scores = np.where(filled, scores, -np.inf)
+        scores -= scores.max(axis=1, keepdims=True)
+        weights = np.exp(scores)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return np.einsum("bw,bwd->bd", weights, values)
+
+    def step(self, token_ids, features):
+        """
+        Feeds one new tick per token and returns the updated predictions.
+
+        :param token_ids: Sequence of token ids, one per row of `features`.
+        :param features: Array of shape (len(token_ids), num_features) holding the new tick.
+        :return: Array of predictions, one row per token.
+        :raises ValueError: If a token id appears more than once; feed its ticks in separate calls.
+        """
+        if len(set(token_ids)) != len(token_ids):
+            raise ValueError("Duplicate token ids in one step; each call advances a token by one tick.")
+        slots = self._slots_for(token_ids)
+        x = np.asarray(features, dtype=np.float32).reshape(len(slots), -1)
+
+        h1 = self._lstm_step(0, x, slots)
+        attended = self._attend(h1, slots)  # Dropout is inactive at inference
+        h2 = self._lstm_step(1, attended, slots)
+        return h2 @ self.dense_kernel + self.dense_bias
+
+    def release(self, token_ids):
+        """
+        Clears the state of the given tokens and frees their slots.
+        """
+        for token_id in token_ids:
+            slot = self.token_slots.pop(token_id, None)
+            if slot is None:
+                continue
+            for layer in range(len(self.cells)):
+                self.hidden[layer][slot] = 0
+                self.cell_state[layer][slot] = 0
+            self.attention_cache[slot] = 0
+            self.cache_position[slot] = 0
+            self.steps_seen[slot] = 0
+            self.free_slots.append(slot)
+
 # Main execution
 def main():
     X, y = generate_data()
@@ -32,5 +161,18 @@ def main():
     # Train model (for demonstration, using limited epochs)
     model.fit(X, y, epochs=10, batch_size=32, validation_split=0.2)
 
+    # Stream ticks for several tokens through the stateful inference engine
+    inference = StatefulLSTMInference(model, max_tokens=8, window_size=X.shape[1])
+    token_ids = ["SOL", "BONK", "JUP"]
+    ticks = np.random.randn(len(token_ids), *X.shape[1:]).astype(np.float32)
+    for t in range(ticks.shape[1]):
+        predictions = inference.step(token_ids, ticks[:, t])
+    print("Per-token predictions:", dict(zip(token_ids, predictions[:, 0])))
+
+    # Stepping through a window must give the same predictions as the full-sequence model
+    expected = model.predict(ticks, verbose=0)
+    print("Max difference from model.predict:", float(np.abs(predictions - expected).max()))
+    assert np.allclose(predictions, expected, atol=1e-4)
+
 if __name__ == "__main__":
     main()
@@ -23,13 +23,8 @@ class ScoreAggregationSystem:
 
         :return: Aggregated risk score
         """
-        # Perform weighted sum of analysis vectors
-        aggregated_score = np.zeros_like(self.analysis_vectors[0])
-        
-        for vec, weight in zip(self.analysis_vectors, self.weights):
-            aggregated_score += vec * weight
-
-        return aggregated_score
+        # Perform weighted sum of analysis vectors as one matrix-vector product
+        return self.weights @ np.vstack(self.analysis_vectors)
 
     def assess_risk(self, aggregated_score):
         """
@@ -40,7 +35,8 @@ class ScoreAggregationSystem:
         """
         # For simplicity, let's say the higher the aggregated score, the higher the risk
         # We use a sigmoid function for probabilistic risk assessment (between 0 and 1).
-        risk_probability = 1 / (1 + np.exp(-aggregated_score))
+        # The tanh form is the same function but never overflows for large negative scores.
+        risk_probability = 0.5 * (1 + np.tanh(0.5 * aggregated_score))
         return risk_probability
 
     def compute_risk_metric(self):
@@ -58,22 +54,69 @@ class ScoreAggregationSystem:
         return risk_metric
 
 
+class BatchScoreAggregator:
+    def __init__(self, weights):
+        """
+        Reusable scorer for many entities at once, built once with fixed weights.
+
+        Scores are computed from a (analyses x entities) matrix as `weights @ matrix`
+        followed by a sigmoid, both written in place into an output buffer. Passing a
+        buffer from `allocate` makes repeated scoring allocation-free.
+
+        :param weights: List of weights associated with each analysis (row of the matrix).
+        """
+        self.weights = np.array(weights, dtype=np.float64)
+        self.weights /= self.weights.sum()
+
+    def allocate(self, num_entities):
+        """
+        Returns an output buffer for scoring `num_entities` entities.
+        """
+        return np.empty(num_entities, dtype=np.float64)
+
+    def score(self, matrix, out=None):
+        """
+        Computes risk probabilities for every entity.
+
+        :param matrix: float64 array of shape (len(weights), num_entities), one row per analysis.
+        :param out: Optional float64 buffer of length num_entities that receives the result.
+        :return: Risk probability per entity (the `out` buffer when given).
+        """
+        if out is None:
+            out = self.allocate(matrix.shape[1])
+        np.dot(self.weights, matrix, out=out)
+        # Numerically stable sigmoid in place: 0.5 * (1 + tanh(x / 2))
+        out *= 0.5
+        np.tanh(out, out=out)
+        out += 1.0
+        out *= 0.5
+        return out
+
+
 # Example usage
+if __name__ == "__main__":
+    # Define multiple analysis vectors (these could represent different risk factors or scores)
+    analysis_vectors = [
+        [0.2, 0.4, 0.6, 0.8],  # Risk scores from analysis 1
+        [0.3, 0.5, 0.7, 0.9],  # Risk scores from analysis 2
+        [0.4, 0.6, 0.8, 1.0],  # Risk scores from analysis 3
+    ]
+
+    # Define the weights for each analysis vector (indicating the importance of each analysis)
+    weights = [0.5, 0.3, 0.2]
 
-# Define multiple analysis vectors (these could represent different risk factors or scores)
-analysis_vectors = [
-    [0.2, 0.4, 0.6, 0.8],  # Risk scores from analysis 1
-    [0.3, 0.5, 0.7, 0.9],  # Risk scores from analysis 2
-    [0.4, 0.6, 0.8, 1.0],  # Risk scores from analysis 3
-]
+    # Initialize the Score Aggregation System
+    aggregation_system = ScoreAggregationSystem(analysis_vectors, weights)
 
-# Define the weights for each analysis vector (indicating the importance of each analysis)
-weights = [0.5, 0.3, 0.2]
+    # Compute the comprehensive risk metric
+    risk_metric = aggregation_system.compute_risk_metric()
 
-# Initialize the Score Aggregation System
-aggregation_system = ScoreAggregationSystem(analysis_vectors, weights)
+    print("Comprehensive Risk Metric:", risk_metric)
 
-# Compute the comprehensive risk metric
-risk_metric = aggregation_system.compute_risk_metric()
+    # Score many entities at once with a scorer built once and a reused output buffer
+    batch_scorer = BatchScoreAggregator(weights)
+    score_matrix = np.array(analysis_vectors, dtype=np.float64)  # analyses x entities
+    score_buffer = batch_scorer.allocate(score_matrix.shape[1])
+    batch_scorer.score(score_matrix, out=score_buffer)
 
-print("Comprehensive Risk Metric:", risk_metric)
+    print("Batched Risk Metric:", score_buffer)
@@ -0,0 +1,182 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+import orjson
+
+class Subscriber:
+    def __init__(self, monitoring_ids, max_alerts=256):
+        """
+        Bounded send buffer of one streaming client.
+
+        Analysis updates are coalesced per monitoring id, so a client that falls behind
+        only receives the latest one. Anomaly alerts are kept in a bounded queue that
+        drops the oldest alert when full.
+
+        :param monitoring_ids: Monitoring ids the client streams.
+        :param max_alerts: Maximum number of alerts buffered for the client.
+        """
+        self.monitoring_ids = monitoring_ids
+        self.updates = OrderedDict()  # monitoring_id -> latest undelivered update
+        self.alerts = deque(maxlen=max_alerts)
+        self.dropped_alerts = 0
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def offer_update(self, monitoring_id, message):
+        self.updates.pop(monitoring_id, None)
+        self.updates[monitoring_id] = message
+        self.ready.set()
+
+    def offer_alert(self, message):
+        if len(self.alerts) == self.alerts.maxlen:
+            self.dropped_alerts += 1
+        self.alerts.append(message)
+        self.ready.set()
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+    async def messages(self):
+        """
+        Yields buffered messages as JSON strings until the subscriber is closed.
+        """
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            if self.closed:
+                return
+            while self.alerts:
+                yield self.alerts.popleft()
+            while self.updates:
+                yield self.updates.popitem(last=False)[1]
+
+class MonitorHub:
+    def __init__(self, service, timeframe="1h", tick=1.0, max_subscribers=1000, max_alerts=256, monitor_ttl=600.0):
+        """
+        Pushes analysis updates and anomaly alerts for monitored tokens to streaming clients.
+
+        Every tick, the tokens with at least one due, connected monitor are analyzed once
+        each, and the serialized result is fanned out to all of their subscribers. Tokens
+        nobody is streaming are not analyzed at all. Monitoring ids that are never
+        connected, or stay disconnected for `monitor_ttl` seconds, are forgotten.
+
+        :param service: TokenAnalysisService providing analyses and anomaly callbacks.
+        :param timeframe: Analysis timeframe streamed to clients.
+        :param tick: Seconds between scheduling rounds; the finest usable update interval.
+        :param max_subscribers: Maximum number of concurrently connected clients.
+        :param max_alerts: Alert buffer size of each client.
+        :param monitor_ttl: Seconds a monitoring id is kept without a connected client.
+        """
+        self.service = service
+        self.timeframe = timeframe
+        self.tick = tick
+        self.max_subscribers = max_subscribers
+        self.max_alerts = max_alerts
+        self.monitor_ttl = monitor_ttl
+        self.monitors = {}                       # monitoring_id -> monitor dict
+        self.subscribers = set()
+        self.subscribers_by_id = {}              # monitoring_id -> Subscriber
+        self.ids_by_token = defaultdict(set)     # token -> connected monitoring ids
+        self.idle = OrderedDict()                # monitoring_id -> time it lost its client, oldest first
+        service.anomaly_listeners.append(self.publish_anomalies)
+
+    def start_monitoring(self, token_addresses, update_interval):
+        monitoring_ids = []
+        now = time.monotonic()
+        for token in token_addresses:
+            monitoring_id = uuid.uuid4().hex
+            self.monitors[monitoring_id] = {"token_address": token, "update_interval": update_interval, "next_due": 0.0}
+            self.idle[monitoring_id] = now
+            monitoring_ids.append(monitoring_id)
+        return monitoring_ids
+
+    def subscribe(self, monitoring_ids):
+        """
+        Connects a client to existing monitoring ids; a later subscriber takes over an id.
+
+        :raises KeyError: If a monitoring id is unknown.
+        :raises OverflowError: If max_subscribers clients are already connected.
+        """
+        unknown = [monitoring_id for monitoring_id in monitoring_ids if monitoring_id not in self.monitors]
+        if unknown:
+            raise KeyError(unknown[0])
+        if len(self.subscribers) >= self.max_subscribers:
+            raise OverflowError("Too many streaming clients.")
+        subscriber = Subscriber(monitoring_ids, self.max_alerts)
+        self.subscribers.add(subscriber)
+        for monitoring_id in monitoring_ids:
+            self.subscribers_by_id[monitoring_id] = subscriber
+            self.idle.pop(monitoring_id, None)
+            self.ids_by_token[self.monitors[monitoring_id]["token_address"]].add(monitoring_id)
+            self.monitors[monitoring_id]["next_due"] = 0.0  # Send a first update right away
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        self.subscribers.discard(subscriber)
+        now = time.monotonic()
+        for monitoring_id in subscriber.monitoring_ids:
+            if self.subscribers_by_id.get(monitoring_id) is subscriber:
+                del self.subscribers_by_id[monitoring_id]
+                self.idle[monitoring_id] = now
+                token = self.monitors[monitoring_id]["token_address"]
+                self.ids_by_token[token].discard(monitoring_id)
+                if not self.ids_by_token[token]:
+                    del self.ids_by_token[token]
+
+    def expire_idle(self, now):
+        """
+        Forgets monitoring ids that have had no connected client for `monitor_ttl` seconds.
+        """
+        while self.idle:
+            monitoring_id, idle_since = next(iter(self.idle.items()))
+            if idle_since + self.monitor_ttl > now:
+                return
+            del self.idle[monitoring_id]
+            del self.monitors[monitoring_id]
+
+    def publish_anomalies(self, events):
+        """
+        Pushes anomaly alerts to the clients monitoring the affected tokens.
+        """
+        for event in events:
+            monitoring_ids = self.ids_by_token.get(event["token_address"])
+            if monitoring_ids:
+                message = orjson.dumps({"type": "anomaly_alert", "data": event}).decode()
+                for subscriber in {self.subscribers_by_id[monitoring_id] for monitoring_id in monitoring_ids}:
+                    subscriber.offer_alert(message)
+
+    async def _publish_token(self, token, monitoring_ids):
+        try:
+            analysis = await self.service.analysis(token, self.timeframe)
+        except Exception as e:
+            print(f"Analysis of {token} failed: {e!r}")
+            return
+        # Serialize once; each subscriber only gets its monitoring id spliced in
+        data = orjson.dumps(analysis).decode()
+        for monitoring_id in monitoring_ids:
+            subscriber = self.subscribers_by_id.get(monitoring_id)
+            if subscriber is not None:
+                subscriber.offer_update(monitoring_id, '{"type":"analysis_update","monitoring_id":"%s",'
+                                                       '"token_address":%s,"data":%s}'
+                                        % (monitoring_id, orjson.dumps(token).decode(), data))
+
+    async def run(self):
+        while True:
+            now = time.monotonic()
+            self.expire_idle(now)
+            due_by_token = defaultdict(list)
+            for token, monitoring_ids in self.ids_by_token.items():
+                for monitoring_id in monitoring_ids:
+                    monitor = self.monitors[monitoring_id]
+                    if monitor["next_due"] <= now:
+                        monitor["next_due"] = now + monitor["update_interval"]
+                        due_by_token[token].append(monitoring_id)
+            await asyncio.gather(*(self._publish_token(token, ids) for token, ids in due_by_token.items()))
+            await asyncio.sleep(self.tick)
+
+    def close(self):
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
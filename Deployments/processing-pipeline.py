@@ -1,50 +1,399 @@
+import argparse
 import asyncio
-import threading
 import random
+import signal
 import time
-from queue import Queue
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from event_log import EventLogReader, EventLogWriter
+from transactions import TRANSACTION_DTYPE, Transaction, to_records
 
-# Simulated blockchain transaction event generator
-async def blockchain_event_stream(event_queue: asyncio.Queue):
-    while True:
+# Marks the end of the event stream so the dispatcher can drain and stop
+END_OF_STREAM = None
+
+# Simulated blockchain transaction event generator, optionally recorded to an event log
+async def blockchain_event_stream(event_queue: asyncio.Queue, stop_event: asyncio.Event,
+                                  event_log: EventLogWriter = None):
+    while not stop_event.is_set():
         await asyncio.sleep(random.uniform(0.1, 0.5))  # Simulating real-time event arrival
-        transaction = {"tx_id": random.randint(1000, 9999), "amount": random.uniform(0.1, 5)}
+        transaction = Transaction(
+            tx_id=random.randint(1000, 9999),
+            wallet=f"0x{random.randint(0, 15):X}",
+            amount=random.uniform(0.1, 5),
+            timestamp=time.time(),
+            token=random.choice(["SOL", "BONK", "JUP"]),
+        )
         print(f"New transaction received: {transaction}")
-        await event_queue.put(transaction)
+        if event_log is not None:
+            event_log.append(transaction)
+        await event_queue.put(transaction)  # Waits while the queue is full (backpressure)
+    await event_queue.put(END_OF_STREAM)
 
-# Worker function to process transaction batches
-def transaction_worker(worker_id, input_queue: Queue, batch_size: int):
-    while True:
-        batch = []
-        for _ in range(batch_size):
-            transaction = input_queue.get()
-            if transaction is None:
-                return  # Graceful shutdown
-            batch.append(transaction)
-        print(f"Worker {worker_id} processing batch: {batch}")
-        time.sleep(random.uniform(0.5, 1.5))  # Simulated processing time
-
-# Async event dispatcher to distribute events to workers
-async def event_dispatcher(event_queue: asyncio.Queue, processing_queue: Queue, num_workers: int, batch_size: int):
-    threads = []
-    for i in range(num_workers):
-        thread = threading.Thread(target=transaction_worker, args=(i, processing_queue, batch_size), daemon=True)
-        thread.start()
-        threads.append(thread)
-    
+# Replays a recorded event log as record batches, at full speed or time-scaled
+async def replay_event_stream(event_queue: asyncio.Queue, log_dir: str, batch_size: int, speed: float = None):
+    loop = asyncio.get_running_loop()
+    first_timestamp = replay_start = None
+    for batch in EventLogReader(log_dir).batches(batch_size):
+        if speed:
+            # Batches are released when their first event is due, scaled by `speed`
+            if first_timestamp is None:
+                first_timestamp, replay_start = batch["timestamp"][0], loop.time()
+            delay = replay_start + (batch["timestamp"][0] - first_timestamp) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await event_queue.put(batch)
+    await event_queue.put(END_OF_STREAM)
+
+# Running total per wallet id, local to the worker process. Partitioned dispatch sends a
+# wallet to a single worker, so these read-modify-write updates never race.
+wallet_totals = {}
+
+def update_wallet_state(records):
+    wallet_ids, inverse = np.unique(records["wallet"], return_inverse=True)
+    batch_totals = np.bincount(inverse, weights=records["amount"])
+    for wallet_id, amount in zip(wallet_ids.tolist(), batch_totals.tolist()):
+        wallet_totals[wallet_id] = wallet_totals.get(wallet_id, 0.0) + amount
+    return len(records)
+
+# Worker function to process one transaction batch
+def transaction_worker(records):
+    update_wallet_state(records)
+    print(f"Processing batch of {len(records)}, total amount {records['amount'].sum():.2f}")
+    time.sleep(random.uniform(0.5, 1.5))  # Simulated processing time
+    return len(records)
+
+def shared_batch_worker(worker, buffer_name, length):
+    """
+    Runs `worker` in a pool process on a batch read straight out of shared memory.
+    """
+    # Pool processes share the parent's resource tracker, so the parent alone unlinks the block
+    buffer = shared_memory.SharedMemory(name=buffer_name)
+    try:
+        records = np.ndarray((length,), dtype=TRANSACTION_DTYPE, buffer=buffer.buf)
+        result = worker(records)
+        del records  # Release the view before closing the mapping
+        return result
+    finally:
+        buffer.close()
+
+class InlineExecutor(Executor):
+    """
+    Executor that runs each call immediately in the submitting thread.
+    """
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+class ThreadBackend:
+    def __init__(self, worker, num_workers):
+        """
+        Runs batches on a thread pool; suited to I/O-bound or GIL-releasing work.
+        """
+        self.worker = worker
+        self.executor = ThreadPoolExecutor(max_workers=num_workers)
+
+    def run_batch(self, loop, batch):
+        return loop.run_in_executor(self.executor, self.worker, to_records(batch))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+class InlineBackend(ThreadBackend):
+    def __init__(self, worker, num_workers=1):
+        """
+        Runs batches synchronously on the event loop thread; useful for debugging and tests.
+        """
+        self.worker = worker
+        self.executor = InlineExecutor()
+
+class ProcessBackend:
+    def __init__(self, worker, num_workers, batch_size, max_in_flight):
+        """
+        Runs batches on a process pool so CPU-bound work scales with core count.
+
+        Each in-flight batch gets one of `max_in_flight` preallocated shared-memory
+        blocks. The batch is packed into it as a record array, and only the block
+        name and the row count are sent to the worker process.
+        """
+        self.worker = worker
+        self.executor = ProcessPoolExecutor(max_workers=num_workers)
+        block_size = batch_size * TRANSACTION_DTYPE.itemsize
+        self.blocks = [shared_memory.SharedMemory(create=True, size=block_size) for _ in range(max_in_flight)]
+        self.free_blocks = list(self.blocks)
+
+    def run_batch(self, loop, batch):
+        # The stage's in-flight limit guarantees a free block for every submitted batch
+        block = self.free_blocks.pop()
+        records = np.ndarray((len(batch),), dtype=TRANSACTION_DTYPE, buffer=block.buf)
+        to_records(batch, out=records)
+        del records
+        future = loop.run_in_executor(self.executor, shared_batch_worker, self.worker, block.name, len(batch))
+        future.add_done_callback(lambda _: self.free_blocks.append(block))
+        return future
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+def make_backend(kind, num_workers, batch_size, max_in_flight, worker=transaction_worker):
+    """
+    Creates the execution backend for the dispatcher: "thread", "process" or "inline".
+    """
+    if kind == "thread":
+        return ThreadBackend(worker, num_workers)
+    if kind == "process":
+        return ProcessBackend(worker, num_workers, batch_size, max_in_flight)
+    if kind == "inline":
+        return InlineBackend(worker)
+    raise ValueError(f"Unknown executor backend: {kind}")
+
+class BatchingStage:
+    def __init__(self, backend, batch_size, max_batch_delay, max_in_flight):
+        """
+        Groups events into batches and runs them on an execution backend.
+
+        A batch is flushed when it reaches `batch_size` events or when its first event
+        has waited `max_batch_delay` seconds, so partial batches still go out during
+        lulls. At most `max_in_flight` batches run at once; while all slots are taken
+        the stage stops reading its input queue, which fills up and blocks producers.
+
+        :param backend: Backend created by make_backend that runs each batch.
+        :param batch_size: Maximum number of events per batch.
+        :param max_batch_delay: Maximum time in seconds an event waits for its batch to fill.
+        :param max_in_flight: Maximum number of batches submitted but not finished.
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_batch_delay = max_batch_delay
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = set()
+        self.processed = 0
+
+    async def _next_batch(self, input_queue: asyncio.Queue):
+        """
+        Collects the next batch; returns (batch, stream_ended).
+        Record arrays from a replayed log are already batched and pass straight through.
+        """
+        first = await input_queue.get()
+        if first is END_OF_STREAM:
+            return [], True
+        if isinstance(first, np.ndarray):
+            return first, False
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_batch_delay
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                event = input_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(input_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if event is END_OF_STREAM:
+                return batch, True
+            batch.append(event)
+        return batch, False
+
+    async def _submit(self, batch):
+        await self.slots.acquire()
+        future = self.backend.run_batch(asyncio.get_running_loop(), batch)
+        self.in_flight.add(future)
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        self.in_flight.discard(future)
+        self.slots.release()
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"Batch failed: {future.exception()!r}")
+        else:
+            self.processed += future.result()
+
+    async def run(self, input_queue: asyncio.Queue):
+        """
+        Consumes the queue until END_OF_STREAM, then waits for in-flight batches.
+        """
+        stream_ended = False
+        while not stream_ended:
+            batch, stream_ended = await self._next_batch(input_queue)
+            if len(batch):
+                await self._submit(batch)
+        if self.in_flight:
+            await asyncio.wait(self.in_flight)
+
+# Async event dispatcher to batch events and hand them to the execution backend
+async def event_dispatcher(event_queue: asyncio.Queue, backend, batch_size: int,
+                           max_batch_delay: float, max_in_flight: int):
+    stage = BatchingStage(backend, batch_size, max_batch_delay, max_in_flight)
+    await stage.run(event_queue)
+    print(f"Dispatcher drained; {stage.processed} transactions processed.")
+
+class PartitionedDispatcher:
+    def __init__(self, backend_kind, num_partitions, batch_size, max_batch_delay,
+                 partition_queue_size, partition_key="wallet", worker=transaction_worker):
+        """
+        Routes every transaction to a fixed partition chosen by its wallet or token.
+
+        Each partition has its own bounded queue, batching stage and single-worker
+        backend, and runs one batch at a time. Events for the same key are therefore
+        processed in arrival order by the same worker, whose state needs no locks.
+        A hot key fills only its partition's queue, which shows up in `depths()`.
+
+        :param backend_kind: Backend type for the partition workers: "thread", "process" or "inline".
+        :param num_partitions: Number of partitions, each served by one worker.
+        :param batch_size: Maximum number of events per batch.
+        :param max_batch_delay: Maximum time in seconds an event waits for its batch to fill.
+        :param partition_queue_size: Capacity of each partition's queue.
+        :param partition_key: Transaction field to partition on: "wallet" or "token".
+        :param worker: Function each partition worker runs on its batches.
+        """
+        self.num_partitions = num_partitions
+        self.partition_key = partition_key
+        self.key_attribute = f"{partition_key}_id"
+        self.queues = [asyncio.Queue(maxsize=partition_queue_size) for _ in range(num_partitions)]
+        self.backends = [make_backend(backend_kind, 1, batch_size, 1, worker) for _ in range(num_partitions)]
+        self.stages = [BatchingStage(backend, batch_size, max_batch_delay, max_in_flight=1)
+                       for backend in self.backends]
+        self.routed = [0] * num_partitions
+
+    def partition_for(self, transaction):
+        return getattr(transaction, self.key_attribute) % self.num_partitions
+
+    def depths(self):
+        """
+        Returns the number of queued events per partition.
+        """
+        return [queue.qsize() for queue in self.queues]
+
+    def hot_partitions(self, min_share=0.5):
+        """
+        Returns partitions holding at least `min_share` of all queued events.
+        """
+        depths = self.depths()
+        total = sum(depths)
+        return [i for i, depth in enumerate(depths) if total and depth / total >= min_share]
+
+    async def _route_records(self, records):
+        # Group a record batch by partition; the stable sort keeps per-key order
+        partitions = records[self.partition_key] % self.num_partitions
+        order = np.argsort(partitions, kind="stable")
+        counts = np.bincount(partitions, minlength=self.num_partitions)
+        grouped = records[order]
+        start = 0
+        for partition, count in enumerate(counts.tolist()):
+            if count:
+                self.routed[partition] += count
+                await self.queues[partition].put(grouped[start:start + count])
+                start += count
+
+    async def _route(self, event_queue: asyncio.Queue):
+        while True:
+            transaction = await event_queue.get()
+            if transaction is END_OF_STREAM:
+                break
+            if isinstance(transaction, np.ndarray):
+                await self._route_records(transaction)
+                continue
+            partition = self.partition_for(transaction)
+            self.routed[partition] += 1
+            # A full partition queue pauses routing, which pushes back on the producer
+            await self.queues[partition].put(transaction)
+        for queue in self.queues:
+            await queue.put(END_OF_STREAM)
+
+    async def run(self, event_queue: asyncio.Queue):
+        """
+        Routes events until END_OF_STREAM, then drains every partition.
+        """
+        try:
+            await asyncio.gather(
+                self._route(event_queue),
+                *(stage.run(queue) for stage, queue in zip(self.stages, self.queues)),
+            )
+        finally:
+            for backend in self.backends:
+                backend.close()
+        return sum(stage.processed for stage in self.stages)
+
+# Periodically report partition queue depths to spot hot keys
+async def monitor_partitions(dispatcher: PartitionedDispatcher, interval: float = 5.0):
     while True:
-        transaction = await event_queue.get()
-        processing_queue.put(transaction)
+        await asyncio.sleep(interval)
+        print(f"Partition depths: {dispatcher.depths()}, hot: {dispatcher.hot_partitions()}")
+
+# Async dispatcher that keeps each wallet's events ordered on a single worker
+async def partitioned_event_dispatcher(event_queue: asyncio.Queue, backend_kind: str, num_partitions: int,
+                                       batch_size: int, max_batch_delay: float, partition_queue_size: int):
+    dispatcher = PartitionedDispatcher(backend_kind, num_partitions, batch_size, max_batch_delay,
+                                       partition_queue_size)
+    monitor = asyncio.create_task(monitor_partitions(dispatcher))
+    try:
+        processed = await dispatcher.run(event_queue)
+    finally:
+        monitor.cancel()
+    print(f"Dispatcher drained; {processed} transactions processed, per partition: {dispatcher.routed}")
+
+# Backtest runner - replays a recorded log through the partitioned dispatcher
+async def backtest(log_dir: str, backend_kind: str = "process", num_partitions: int = 4,
+                   batch_size: int = 65536, speed: float = None, worker=update_wallet_state):
+    event_queue = asyncio.Queue(maxsize=num_partitions * 2)
+    dispatcher = PartitionedDispatcher(backend_kind, num_partitions, batch_size, max_batch_delay=0.0,
+                                       partition_queue_size=2, worker=worker)
+    start = time.perf_counter()
+    replay = asyncio.create_task(replay_event_stream(event_queue, log_dir, batch_size, speed))
+    processed = await dispatcher.run(event_queue)
+    await replay
+    elapsed = time.perf_counter() - start
+    print(f"Backtest replayed {processed} transactions in {elapsed:.2f}s "
+          f"({processed / elapsed:,.0f} events/s), per partition: {dispatcher.routed}")
+    return processed
 
 # Main event loop
-async def main():
-    event_queue = asyncio.Queue()
-    processing_queue = Queue()
-    num_workers = 4  # Number of parallel workers
-    batch_size = 5  # Transactions per batch
-    
-    asyncio.create_task(blockchain_event_stream(event_queue))
-    await event_dispatcher(event_queue, processing_queue, num_workers, batch_size)
+async def main(backend_kind="process", record_dir=None):
+    num_workers = 4  # Number of parallel workers, one per partition
+    batch_size = 5  # Maximum transactions per batch
+    max_batch_delay = 1.0  # Seconds before a partial batch is flushed
+    partition_queue_size = batch_size * 4  # Events buffered per partition
+    event_queue = asyncio.Queue(maxsize=batch_size * num_workers)
+
+    # Stop producing on SIGINT/SIGTERM and let the dispatcher drain queued work
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    event_log = EventLogWriter(record_dir) if record_dir else None
+    try:
+        producer = asyncio.create_task(blockchain_event_stream(event_queue, stop_event, event_log))
+        await partitioned_event_dispatcher(event_queue, backend_kind, num_workers, batch_size,
+                                           max_batch_delay, partition_queue_size)
+        await producer
+    finally:
+        if event_log is not None:
+            event_log.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Transaction processing pipeline")
+    parser.add_argument("--backend", choices=["thread", "process", "inline"], default="process")
+    parser.add_argument("--record", metavar="DIR", help="Record incoming events to an event log")
+    parser.add_argument("--replay", metavar="DIR", help="Backtest by replaying an event log")
+    parser.add_argument("--speed", type=float, help="Replay time scale (e.g. 10 = 10x); full speed if omitted")
+    args = parser.parse_args()
+
+    if args.replay:
+        asyncio.run(backtest(args.replay, args.backend, speed=args.speed))
+    else:
+        asyncio.run(main(args.backend, args.record))
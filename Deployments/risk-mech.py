@@ -1,17 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from scipy.special import factorial
 
 class RiskAssessmentSystem:
-    def __init__(self, data, scoring_models, thresholds=None):
+    def __init__(self, data, scoring_models, thresholds=None, weights=None, final_threshold=0.6):
         """
         Initializes the Risk Assessment System.
 
         :param data: Input data for risk scoring (list or numpy array).
         :param scoring_models: List of risk scoring models.
         :param thresholds: Optional thresholds for each model (if applicable).
+        :param weights: Optional aggregation weight for each model; models are weighted equally by default.
+        :param final_threshold: Comprehensive risk at or above which the final risk is high.
         """
         self.data = np.array(data)
         self.scoring_models = scoring_models
         self.thresholds = thresholds if thresholds else [0.5] * len(scoring_models)
+        self.weights = weights if weights else [1.0] * len(scoring_models)
+        self.final_threshold = final_threshold
 
     def apply_scoring_model(self, model, data):
         """
@@ -48,8 +54,8 @@ class RiskAssessmentSystem:
         """
         # Here we take a simple weighted average for aggregation
         weighted_scores = np.array([score[0] for score in risk_scores])
-        weights = np.array([0.33, 0.33, 0.34])  # Example weights for 3 models
-        
+        weights = np.array(self.weights, dtype=np.float64)
+
         # Normalize weights if needed
         weights /= weights.sum()
         
@@ -60,12 +66,88 @@ class RiskAssessmentSystem:
         """
         Assesses the final risk based on the comprehensive risk score.
 
-        :param comprehensive_risk: The aggregated comprehensive risk score.
-        :return: Final risk classification (0: Low, 1: High).
+        :param comprehensive_risk: The aggregated comprehensive risk score, a scalar or an array.
+        :return: Final risk classification (0: Low, 1: High), with the same shape as the input.
         """
         # Simple binary classification based on risk threshold
-        threshold = 0.6  # Assume a threshold for final classification
-        return 1 if comprehensive_risk >= threshold else 0
+        final_risk = np.where(np.asarray(comprehensive_risk) >= self.final_threshold, 1, 0)
+        return final_risk if final_risk.ndim else int(final_risk)
+
+class StreamingRiskEngine:
+    def __init__(self, final_threshold=0.6, max_workers=None):
+        """
+        Long-lived risk scorer: models are registered once and data arrives in batches.
+
+        Models are independent, so each batch is scored by all of them concurrently on a
+        thread pool (NumPy releases the GIL in its array kernels). Per-model thresholds,
+        aggregation and the final classification are then applied to the whole
+        (models x batch) score matrix at once.
+
+        :param final_threshold: Comprehensive risk at or above which the final risk is high.
+        :param max_workers: Size of the thread pool; defaults to ThreadPoolExecutor's default.
+        """
+        self.final_threshold = final_threshold
+        self.models = []
+        self.raw_weights = []
+        self.thresholds = np.empty(0)
+        self.weights = np.empty(0)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def register(self, model, weight=1.0, threshold=0.5):
+        """
+        Adds a scoring model that maps a 1-D data batch to one risk score per element.
+
+        :param weight: Relative weight of the model in the comprehensive risk.
+        :param threshold: Score at or above which the model classifies an element as high risk.
+        """
+        self.models.append(model)
+        self.raw_weights.append(weight)
+        self.thresholds = np.append(self.thresholds, threshold)
+        self.weights = np.array(self.raw_weights, dtype=np.float64)
+        self.weights /= self.weights.sum()
+
+    def score_batch(self, data):
+        """
+        Scores one batch with every registered model.
+
+        :param data: 1-D array-like of inputs.
+        :return: Dict with the (models x batch) score matrix, per-model classifications,
+                 the comprehensive risk and the final classification for every element.
+        """
+        if not self.models:
+            raise ValueError("No scoring models registered.")
+        data = np.asarray(data, dtype=np.float64)
+        scores = np.empty((len(self.models), len(data)), dtype=np.float64)
+
+        def run_model(index):
+            scores[index] = self.models[index](data)
+
+        # Consume the iterator so model exceptions propagate here
+        list(self.executor.map(run_model, range(len(self.models))))
+
+        comprehensive_risk = self.weights @ scores
+        return {
+            "scores": scores,
+            "classifications": (scores >= self.thresholds[:, None]).astype(np.int8),
+            "comprehensive_risk": comprehensive_risk,
+            "final_risk": (comprehensive_risk >= self.final_threshold).astype(np.int8),
+        }
+
+    def stream(self, batches):
+        """
+        Scores batches from an iterable as they arrive, yielding one result per batch.
+        """
+        for batch in batches:
+            yield self.score_batch(batch)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 # Risk scoring models (example scoring algorithms)
 def probabilistic_model(data):
@@ -87,7 +169,7 @@ def factorial_model(data):
     A model that computes the factorial-based risk score.
     This is just an example of how more sophisticated algorithms can be used.
     """
-    return np.factorial(np.clip(data, 0, 5))  # Ensure data stays within range for factorial computation
+    return factorial(np.clip(data, 0, 5))  # Ensure data stays within range for factorial computation
 
 # Example usage
 
@@ -116,3 +198,13 @@ for model, (score, classification) in zip(scoring_models, risk_scores):
 
 print(f"\nComprehensive Risk Score: {comprehensive_risk}")
 print(f"Final Risk Classification (0: Low, 1: High): {final_risk}")
+
+# Streaming usage: register the models once, then score batches as they arrive
+with StreamingRiskEngine() as risk_engine:
+    for model in scoring_models:
+        risk_engine.register(model)
+
+    data_batches = (np.random.rand(1000) for _ in range(3))
+    for batch_number, result in enumerate(risk_engine.stream(data_batches)):
+        high_risk = int(result["final_risk"].sum())
+        print(f"Batch {batch_number}: {high_risk} of {len(result['final_risk'])} elements at high risk")
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+import numpy as np
+from transactions import tokens
+
+class RiskCache:
+    def __init__(self, max_entries=10000, ttl=60.0, clock=time.monotonic):
+        """
+        Memoizes token risk analyses keyed by (token_address, timeframe).
+
+        Entries expire after `ttl` seconds and the least recently used ones are evicted
+        beyond `max_entries`. Ingesting new transactions for a token invalidates only
+        that token's entries. Concurrent requests for the same key share one computation.
+
+        The cache is meant to be used from a single asyncio event loop.
+
+        :param max_entries: Maximum number of cached results.
+        :param ttl: Seconds a result stays valid if its token sees no new transactions.
+        :param clock: Monotonic time source, in seconds.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()            # (token, timeframe) -> (expires_at, value)
+        self.keys_by_token = defaultdict(set)   # token -> cached keys for that token
+        self.pending = {}                       # (token, timeframe) -> task of the running computation
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token, timeframe):
+        """
+        Returns the cached result, or None if it is missing or expired.
+        """
+        key = (token, timeframe)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, token, timeframe, value):
+        key = (token, timeframe)
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        self.keys_by_token[token].add(key)
+        while len(self.entries) > self.max_entries:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+
+    def _remove(self, key):
+        del self.entries[key]
+        token_keys = self.keys_by_token[key[0]]
+        token_keys.discard(key)
+        if not token_keys:
+            del self.keys_by_token[key[0]]
+
+    async def get_or_compute(self, token, timeframe, compute):
+        """
+        Returns the cached result or computes it with `await compute(token, timeframe)`.
+
+        The computation runs as a task of its own that every caller for the key awaits,
+        so further callers share it instead of starting their own, and a cancelled
+        caller only stops waiting without cancelling the others.
+        """
+        value = self.get(token, timeframe)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        key = (token, timeframe)
+        task = self.pending.get(key)
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._compute(token, timeframe, compute))
+            # Mark a failure retrieved in case every caller stopped waiting for it
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self.pending[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, token, timeframe, compute):
+        key = (token, timeframe)
+        task = asyncio.current_task()
+        try:
+            value = await compute(token, timeframe)
+        finally:
+            # invalidate() detaches computations that started before new data arrived;
+            # their result is still returned to the callers that waited for it, but not cached
+            current = self.pending.get(key) is task
+            if current:
+                del self.pending[key]
+        if current:
+            self.put(token, timeframe, value)
+        return value
+
+    def invalidate(self, token):
+        """
+        Drops every cached result for `token`. Requests arriving afterwards start a
+        fresh computation instead of joining one that started before the new data.
+        """
+        for key in self.keys_by_token.pop(token, ()):
+            del self.entries[key]
+        for key in [key for key in self.pending if key[0] == token]:
+            del self.pending[key]
+
+    def detach(self, token, timeframe):
+        """
+        Keeps the running computation for a key from being cached. Its current callers
+        still get its result; requests arriving afterwards start a fresh computation.
+        """
+        self.pending.pop((token, timeframe), None)
+
+    def ingest(self, records):
+        """
+        Invalidates the tokens touched by a TRANSACTION_DTYPE batch.
+        """
+        pending_tokens = {key[0] for key in self.pending}
+        for token_id in np.unique(records["token"]):
+            token = tokens.resolve(token_id)
+            if token in self.keys_by_token or token in pending_tokens:
+                self.invalidate(token)
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "pending": len(self.pending),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
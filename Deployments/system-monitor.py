@@ -1,34 +1,132 @@
-from flask import Flask, jsonify
+from collections import deque
+from flask import Flask, jsonify, request
 import psutil
+import threading
 import time
 
 app = Flask(__name__)
 
+class MetricsSampler(threading.Thread):
+    def __init__(self, interval=1.0, history_size=300, top_processes=10):
+        """
+        Background thread that samples system metrics on a fixed cadence.
+
+        Each sample is a new dict that is never modified after it is published, so
+        readers take `snapshot` without locking and never see a partial update. It is
+        None until the first sample, one interval after the CPU baseline is read.
+
+        :param interval: Seconds between samples; CPU percentages are averaged over it.
+        :param history_size: Number of past samples kept in the history ring buffer.
+        :param top_processes: Number of processes reported, ordered by CPU usage.
+        """
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.top_processes = top_processes
+        self.history = deque(maxlen=history_size)
+        self.stop_event = threading.Event()
+        self.snapshot = None
+        self.prime()
+
+    def prime(self):
+        """Reads the CPU counters that the next sample's percentages are measured against."""
+        psutil.cpu_percent(interval=None)
+        psutil.cpu_percent(interval=None, percpu=True)
+        for process in psutil.process_iter():
+            try:
+                process.cpu_percent(interval=None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+    def sample(self):
+        """Collects and publishes one snapshot of system-wide, per-core and per-process stats."""
+        memory_info = psutil.virtual_memory()
+        processes = []
+        for process in psutil.process_iter(["pid", "name", "memory_info"]):
+            try:
+                cpu_usage = process.cpu_percent(interval=None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            memory = process.info["memory_info"]
+            processes.append({
+                "pid": process.info["pid"],
+                "name": process.info["name"],
+                "cpu_usage": cpu_usage,
+                "memory_usage_mb": memory.rss / (1024 * 1024) if memory else 0.0,
+            })
+        processes.sort(key=lambda p: p["cpu_usage"], reverse=True)
+
+        snapshot = {
+            "timestamp": time.time(),
+            "cpu_usage": psutil.cpu_percent(interval=None),
+            "cpu_usage_per_core": psutil.cpu_percent(interval=None, percpu=True),
+            "memory_usage_mb": memory_info.used / (1024 * 1024),
+            "memory_percent": memory_info.percent,
+            "processes": processes[:self.top_processes],
+        }
+        self.snapshot = snapshot
+        self.history.append(snapshot)
+        return snapshot
+
+    def get_history(self, limit=None):
+        """
+        Returns up to `limit` most recent snapshots, oldest first, or all of them if limit is None.
+
+        :raises ValueError: If limit is less than 1.
+        """
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be at least 1, got {limit}.")
+        # tuple() copies the deque in one C call, so a concurrent append cannot interleave
+        history = tuple(self.history)
+        return list(history[-limit:] if limit is not None else history)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.stop_event.set()
+
 class SystemMonitoring:
-    def __init__(self):
+    def __init__(self, sample_interval=1.0, history_size=300, top_processes=10):
         """
         Initializes the System Monitoring engine.
+
+        Metrics come from a background MetricsSampler, so reading them never blocks.
+
+        :param sample_interval: Seconds between metric samples.
+        :param history_size: Number of past samples kept for /metrics/history.
+        :param top_processes: Number of processes included in each sample.
         """
         self.start_time = time.time()
-    
+        self.sampler = MetricsSampler(sample_interval, history_size, top_processes)
+        self.sampler.start()
+
     def get_cpu_usage(self):
-        """Returns the current CPU usage percentage."""
-        return psutil.cpu_percent(interval=1)
-    
+        """Returns the CPU usage percentage over the latest sampling interval, or None before the first sample."""
+        snapshot = self.sampler.snapshot
+        return snapshot["cpu_usage"] if snapshot else None
+
     def get_memory_usage(self):
-        """Returns the current memory usage in MB."""
-        memory_info = psutil.virtual_memory()
-        return memory_info.used / (1024 * 1024)
-    
+        """Returns the current memory usage in MB, or None before the first sample."""
+        snapshot = self.sampler.snapshot
+        return snapshot["memory_usage_mb"] if snapshot else None
+
     def get_uptime(self):
         """Returns the system uptime in seconds."""
         return time.time() - self.start_time
-    
+
     def get_metrics(self):
-        """Returns a dictionary of system metrics."""
+        """Returns a dictionary of system metrics, or None before the first sample."""
+        snapshot = self.sampler.snapshot
+        if snapshot is None:
+            return None
         return {
-            "cpu_usage": self.get_cpu_usage(),
-            "memory_usage_mb": self.get_memory_usage(),
+            "cpu_usage": snapshot["cpu_usage"],
+            "cpu_usage_per_core": snapshot["cpu_usage_per_core"],
+            "memory_usage_mb": snapshot["memory_usage_mb"],
+            "memory_percent": snapshot["memory_percent"],
+            "processes": snapshot["processes"],
+            "sampled_at": snapshot["timestamp"],
             "uptime_seconds": self.get_uptime()
         }
 
@@ -37,7 +135,19 @@ monitor = SystemMonitoring()
 @app.route("/metrics", methods=["GET"])
 def metrics():
     """Exposes system monitoring metrics through a REST API endpoint."""
-    return jsonify(monitor.get_metrics())
+    metrics = monitor.get_metrics()
+    if metrics is None:
+        return jsonify({"error": "Metrics are not sampled yet."}), 503
+    return jsonify(metrics)
+
+@app.route("/metrics/history", methods=["GET"])
+def metrics_history():
+    """Exposes the most recent metric samples; ?limit=N restricts the count."""
+    limit = request.args.get("limit")
+    try:
+        return jsonify(monitor.sampler.get_history(int(limit) if limit is not None else None))
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer."}), 400
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -1,9 +1,17 @@
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import accuracy_score
 import joblib
+from joblib import Parallel, delayed
+import atexit
+import copy
+import glob
+import hashlib
+import json
+import tempfile
+import threading
 import time
 from datetime import datetime
 import os
@@ -21,39 +29,378 @@ def get_new_data(batch_size=100):
     y = (X[:, 0] + X[:, 1] * 2 + X[:, 2] * 3) > 1.5  # Target variable
     return X, y
 
+# Candidate configurations trained side by side on every retraining cycle
+CANDIDATE_CONFIGS = [
+    {"C": 0.1},
+    {"C": 1.0},
+    {"C": 10.0},
+    {"C": 1.0, "class_weight": "balanced"},
+    {"C": 1.0, "l1_ratio": 1.0, "solver": "liblinear"},  # L1 penalty
+    {"C": 10.0, "l1_ratio": 1.0, "solver": "liblinear"},
+]
+
 # Model Training
-def train_model(X_train, y_train):
-    model = LogisticRegression()
+def train_model(X_train, y_train, **params):
+    model = LogisticRegression(**params)
     model.fit(X_train, y_train)
     return model
 
+# Share arrays with worker processes through read-only memory maps instead of copies
+def share_arrays(folder, **arrays):
+    shared = {}
+    for name, array in arrays.items():
+        array_file = os.path.join(folder, f"{name}.joblib")
+        joblib.dump(array, array_file, compress=0)
+        shared[name] = joblib.load(array_file, mmap_mode="r")
+    return shared
+
+# Parallel Candidate Training - one candidate configuration per core
+def train_candidates(X_train, y_train, configs=CANDIDATE_CONFIGS, n_jobs=-1):
+    with tempfile.TemporaryDirectory(prefix="train-") as folder:
+        shared = share_arrays(folder, X=X_train, y=y_train)
+        return Parallel(n_jobs=n_jobs)(
+            delayed(train_model)(shared["X"], shared["y"], **config) for config in configs
+        )
+
+# Incremental Model Training - updates an existing model with a mini-batch only
+def create_incremental_model():
+    # Logistic loss keeps the incremental model comparable to LogisticRegression
+    return SGDClassifier(loss="log_loss", random_state=42)
+
+def train_model_incremental(model, X_batch, y_batch, classes=(False, True)):
+    if model is None:
+        model = create_incremental_model()
+    if hasattr(model, "partial_fit"):
+        model.partial_fit(X_batch, y_batch, classes=np.asarray(classes))
+    else:
+        # Estimators without partial_fit reuse their previous solution as a starting point
+        model.set_params(warm_start=True)
+        model.fit(X_batch, y_batch)
+    return model
+
+# Rolling hold-out set - a fixed-size buffer refreshed with a slice of each new batch
+class RollingHoldout:
+    def __init__(self, capacity=1000, num_features=10, holdout_fraction=0.2, random_state=42):
+        """
+        Keeps the most recent `capacity` hold-out samples in preallocated arrays.
+
+        :param capacity: Maximum number of samples kept in the hold-out set.
+        :param num_features: Number of features per sample.
+        :param holdout_fraction: Fraction of every incoming batch reserved for evaluation.
+        :param random_state: Seed used to pick the hold-out rows of each batch.
+        """
+        self.capacity = capacity
+        self.holdout_fraction = holdout_fraction
+        self.rng = np.random.default_rng(random_state)
+        self.X = np.empty((capacity, num_features))
+        self.y = np.empty(capacity, dtype=bool)
+        self.size = 0
+        self.position = 0
+
+    def split(self, X_batch, y_batch):
+        """
+        Moves a slice of the batch into the hold-out buffer and returns the rest for training.
+        """
+        n_holdout = int(round(len(X_batch) * self.holdout_fraction))
+        mask = np.zeros(len(X_batch), dtype=bool)
+        mask[self.rng.choice(len(X_batch), size=n_holdout, replace=False)] = True
+        self.add(X_batch[mask], y_batch[mask])
+        return X_batch[~mask], y_batch[~mask]
+
+    def add(self, X_new, y_new):
+        """
+        Appends samples, overwriting the oldest ones once the buffer is full.
+        """
+        X_new, y_new = X_new[-self.capacity:], y_new[-self.capacity:]
+        idx = (self.position + np.arange(len(X_new))) % self.capacity
+        self.X[idx] = X_new
+        self.y[idx] = y_new
+        self.position = (self.position + len(X_new)) % self.capacity
+        self.size = min(self.size + len(X_new), self.capacity)
+
+    def data(self):
+        return self.X[:self.size], self.y[:self.size]
+
 # Model Evaluation
 def evaluate_model(model, X_test, y_test):
     y_pred = model.predict(X_test)
     accuracy = accuracy_score(y_test, y_pred)
     return accuracy
 
+# Batched Evaluation - scores every model on the same hold-out set in one pass
+def evaluate_models(models, X_test, y_test):
+    is_binary_linear = all(
+        hasattr(model, "coef_") and model.coef_.shape[0] == 1 and len(model.classes_) == 2
+        for model in models
+    )
+    if not is_binary_linear:
+        return np.array([evaluate_model(model, X_test, y_test) for model in models])
+    
+    # Stack the linear models into one weight matrix: (samples, features) @ (features, models)
+    weights = np.vstack([model.coef_ for model in models])
+    intercepts = np.concatenate([model.intercept_ for model in models])
+    positive_labels = np.array([model.classes_[1] for model in models])
+    predicted_positive = X_test @ weights.T + intercepts > 0
+    actual_positive = np.asarray(y_test)[:, None] == positive_labels[None, :]
+    return (predicted_positive == actual_positive).mean(axis=0)
+
+# Versioned Model Store - content-addressed artifacts with an atomically swapped pointer
+class ModelStore:
+    def __init__(self, root=MODEL_PATH):
+        """
+        Stores every saved model as an immutable, uncompressed joblib artifact named
+        after its content hash. Uncompressed artifacts keep NumPy arrays in place on
+        disk, so they can be loaded with `mmap_mode` and shared between processes.
+
+        Layout per model name:
+            <root>/<name>/versions/<sha256>.joblib
+            <root>/<name>/manifest.json  (version history with hashes and timestamps)
+            <root>/<name>/CURRENT        (hash of the deployed version)
+
+        :param root: Directory holding all model artifacts.
+        """
+        self.root = root
+
+    def _model_dir(self, name):
+        return os.path.join(self.root, os.path.splitext(name)[0])
+
+    def _write_atomic(self, path, data):
+        # Write to a temporary file in the same directory, then rename over the target
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _file_hash(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def manifest(self, name):
+        """
+        Returns the version history of a model, oldest first.
+        """
+        manifest_file = os.path.join(self._model_dir(name), "manifest.json")
+        if not os.path.exists(manifest_file):
+            return []
+        with open(manifest_file) as f:
+            return json.load(f)
+
+    def current_version(self, name):
+        """
+        Returns the content hash of the deployed version, or None if nothing is deployed.
+        """
+        pointer = os.path.join(self._model_dir(name), "CURRENT")
+        try:
+            with open(pointer) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, model, name):
+        """
+        Saves a new version of the model and makes it the current one.
+
+        :return: Content hash identifying the saved version.
+        """
+        versions_dir = os.path.join(self._model_dir(name), "versions")
+        os.makedirs(versions_dir, exist_ok=True)
+
+        # Dump uncompressed so arrays stay memory-mappable, then name the file by its hash
+        fd, tmp_path = tempfile.mkstemp(dir=versions_dir, prefix=".tmp-")
+        os.close(fd)
+        try:
+            joblib.dump(model, tmp_path, compress=0)
+            version = self._file_hash(tmp_path)
+            os.replace(tmp_path, os.path.join(versions_dir, f"{version}.joblib"))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        manifest = self.manifest(name)
+        if not any(entry["version"] == version for entry in manifest):
+            manifest.append({
+                "version": version,
+                "model_type": type(model).__name__,
+                "saved_at": datetime.now().isoformat()
+            })
+            self._write_atomic(os.path.join(self._model_dir(name), "manifest.json"),
+                               json.dumps(manifest, indent=2).encode())
+
+        # Readers resolve CURRENT first, so they only ever see complete artifacts
+        self._write_atomic(os.path.join(self._model_dir(name), "CURRENT"), version.encode())
+        return version
+
+    def load(self, name, version=None, mmap_mode="r"):
+        """
+        Loads a model version (the current one by default).
+
+        :param mmap_mode: Passed to joblib.load; "r" maps arrays read-only without copying.
+        :return: The model, or None if no such version exists.
+        """
+        version = version or self.current_version(name)
+        if version is None:
+            return None
+        model_file = os.path.join(self._model_dir(name), "versions", f"{version}.joblib")
+        if not os.path.exists(model_file):
+            return None
+        return joblib.load(model_file, mmap_mode=mmap_mode)
+
+# Hot-reloading handle for serving workers
+class ModelHandle:
+    def __init__(self, store, name, mmap_mode="r"):
+        """
+        Keeps a loaded model and swaps it when the store's current version changes.
+        Checking for a new version costs one small file read.
+        """
+        self.store = store
+        self.name = name
+        self.mmap_mode = mmap_mode
+        self.version = None
+        self.model = None
+
+    def get(self):
+        version = self.store.current_version(self.name)
+        if version is not None and version != self.version:
+            self.model = self.store.load(self.name, version, mmap_mode=self.mmap_mode)
+            self.version = version
+        return self.model
+
+model_store = ModelStore(MODEL_PATH)
+
 # Save the model
 def save_model(model, model_name):
-    model_file = os.path.join(MODEL_PATH, model_name)
-    joblib.dump(model, model_file)
+    return model_store.save(model, model_name)
 
 # Load the model
-def load_model(model_name):
-    model_file = os.path.join(MODEL_PATH, model_name)
-    if os.path.exists(model_file):
-        return joblib.load(model_file)
-    else:
-        return None
+def load_model(model_name, mmap_mode="r"):
+    return model_store.load(model_name, mmap_mode=mmap_mode)
+
+# Structured Training Log - buffered JSON lines, rotated by date and size
+class TrainingLogWriter:
+    def __init__(self, log_dir=LOG_PATH, flush_every=100, flush_interval=5.0, max_file_bytes=64 * 1024 * 1024):
+        """
+        Buffers training records in memory and appends them to JSON-lines files.
 
-# Log results to a file
+        Records are flushed once `flush_every` of them are pending, by a background
+        thread once the oldest pending record is `flush_interval` seconds old, on
+        `flush()` and at exit. Files are named training_<date>.<part>.jsonl after the
+        date of each record's timestamp, and a new part is started once the current
+        one exceeds `max_file_bytes`.
+
+        :param log_dir: Directory holding the log files.
+        :param flush_every: Number of buffered records that triggers a flush.
+        :param flush_interval: Maximum age in seconds of a buffered record.
+        :param max_file_bytes: Size at which the current file is rotated.
+        """
+        self.log_dir = log_dir
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.buffer = []  # (date, JSON line) pairs
+        self.oldest_pending = None
+        self.lock = threading.Lock()
+        self.current_date = None
+        self.current_part = 0
+        self.stop_event = threading.Event()
+        self.flusher = None  # Started with the first write
+        atexit.register(self.close)
+
+    def _run_flusher(self):
+        while not self.stop_event.wait(self.flush_interval / 2):
+            with self.lock:
+                due = (self.oldest_pending is not None
+                       and time.monotonic() - self.oldest_pending >= self.flush_interval)
+            if due:
+                self.flush()
+
+    def _log_file(self, date):
+        # Continue the latest part of the day, starting a new one once it is full
+        if date != self.current_date:
+            parts = glob.glob(os.path.join(self.log_dir, f"training_{date}.*.jsonl"))
+            self.current_part = max((int(p.rsplit(".", 2)[-2]) for p in parts), default=0)
+            self.current_date = date
+        log_file = os.path.join(self.log_dir, f"training_{date}.{self.current_part}.jsonl")
+        if os.path.exists(log_file) and os.path.getsize(log_file) >= self.max_file_bytes:
+            self.current_part += 1
+            log_file = os.path.join(self.log_dir, f"training_{date}.{self.current_part}.jsonl")
+        return log_file
+
+    def write(self, record):
+        """
+        Buffers one record; a `timestamp` field is added when missing.
+        """
+        record.setdefault("timestamp", datetime.now().isoformat())
+        date = str(record["timestamp"])[:10]  # ISO timestamps start with YYYY-MM-DD
+        with self.lock:
+            self.buffer.append((date, json.dumps(record)))
+            if self.oldest_pending is None:
+                self.oldest_pending = time.monotonic()
+            due = len(self.buffer) >= self.flush_every
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self._run_flusher, name="training-log-flusher", daemon=True)
+                self.flusher.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Appends all buffered records to the log files of their dates, one write per file.
+        """
+        with self.lock:
+            if not self.buffer:
+                return
+            pending, self.buffer, self.oldest_pending = self.buffer, [], None
+            lines_by_date = {}
+            for date, line in pending:
+                lines_by_date.setdefault(date, []).append(line)
+            for date, lines in sorted(lines_by_date.items()):
+                with open(self._log_file(date), "a") as log:
+                    log.write("\n".join(lines) + "\n")
+
+    def close(self):
+        """
+        Stops the background flusher and writes any buffered records.
+        """
+        self.stop_event.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        self.flush()
+
+# Query the structured training log, e.g. to chart model accuracy over time
+def read_training_log(start_date=None, end_date=None, log_type=None, log_dir=LOG_PATH):
+    training_log.flush()
+    frames = []
+    for log_file in sorted(glob.glob(os.path.join(log_dir, "training_*.jsonl"))):
+        date = os.path.basename(log_file).split("_", 1)[1].split(".", 1)[0]
+        if (start_date and date < start_date) or (end_date and date > end_date):
+            continue
+        frames.append(pd.read_json(log_file, lines=True))
+    if not frames:
+        return pd.DataFrame(columns=["timestamp", "log_type", "model", "accuracy"])
+    log = pd.concat(frames, ignore_index=True)
+    if log_type is not None:
+        log = log[log["log_type"] == log_type]
+    return log.sort_values("timestamp").reset_index(drop=True)
+
+training_log = TrainingLogWriter(LOG_PATH)
+
+# Log results to the structured training log
 def log_training_result(model_name, accuracy, log_type="Training"):
-    log_file = os.path.join(LOG_PATH, f"{log_type}_log_{datetime.now().strftime('%Y-%m-%d')}.txt")
-    with open(log_file, "a") as log:
-        log.write(f"{datetime.now()} - {log_type} - Model: {model_name}, Accuracy: {accuracy:.4f}\n")
+    training_log.write({"log_type": log_type, "model": model_name, "accuracy": float(accuracy)})
 
 # Retraining Pipeline
-def retraining_pipeline():
+def retraining_pipeline(configs=CANDIDATE_CONFIGS):
     # Fetch new data
     X, y = get_new_data(batch_size=100)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -61,26 +408,32 @@ def retraining_pipeline():
     # Load the previous model
     current_model = load_model("current_model.pkl")
     
-    # Train a new model
-    new_model = train_model(X_train, y_train)
+    # Train all candidate configurations in parallel
+    candidates = train_candidates(X_train, y_train, configs)
     
-    # Evaluate the new model
-    new_model_accuracy = evaluate_model(new_model, X_test, y_test)
+    # Evaluate the candidates and the current model on the same hold-out set
+    models = candidates + ([current_model] if current_model is not None else [])
+    accuracies = evaluate_models(models, X_test, y_test)
+    candidate_accuracies = accuracies[:len(candidates)]
+    best = int(np.argmax(candidate_accuracies))
+    new_model, new_model_accuracy = candidates[best], candidate_accuracies[best]
     
     # Compare model performance
     if current_model is not None:
-        current_model_accuracy = evaluate_model(current_model, X_test, y_test)
+        current_model_accuracy = accuracies[-1]
         print(f"Current Model Accuracy: {current_model_accuracy:.4f}")
     else:
         current_model_accuracy = 0  # No previous model available, so consider accuracy as 0 for comparison
     
-    print(f"New Model Accuracy: {new_model_accuracy:.4f}")
+    for config, accuracy in zip(configs, candidate_accuracies):
+        print(f"Candidate {config} Accuracy: {accuracy:.4f}")
+    print(f"Best Candidate {configs[best]} Accuracy: {new_model_accuracy:.4f}")
     
     # Log the evaluation results
     log_training_result("current_model.pkl", current_model_accuracy, log_type="Current")
     log_training_result("new_model.pkl", new_model_accuracy, log_type="New")
     
-    # Deploy the new model if it performs better
+    # Deploy the best candidate if it performs better
     if new_model_accuracy > current_model_accuracy:
         print("New model performs better. Deploying new model.")
         save_model(new_model, "current_model.pkl")
@@ -91,12 +444,60 @@ def retraining_pipeline():
     # Optionally, trigger retraining periodically (simulate retraining interval)
     time.sleep(5)  # Sleep for 5 seconds for this example, adjust as necessary
 
+# Incremental Retraining Pipeline - cost is proportional to the new data only
+def incremental_retraining_pipeline(holdout, num_batches=10, batch_size=100):
+    # Load the previous model into memory, since a copy of it will be trained further
+    current_model = load_model("current_model.pkl", mmap_mode=None)
+
+    # Continue training a copy so the deployed model stays untouched until promotion.
+    # A full-refit model cannot be updated in place, so the candidate starts fresh instead,
+    # while the deployed model is still evaluated against it below.
+    if current_model is not None and hasattr(current_model, "partial_fit"):
+        new_model = copy.deepcopy(current_model)
+    else:
+        new_model = create_incremental_model()
+    
+    # Stream mini-batches of new data into the candidate model
+    for _ in range(num_batches):
+        X_batch, y_batch = get_new_data(batch_size=batch_size)
+        X_train, y_train = holdout.split(X_batch, y_batch)
+        new_model = train_model_incremental(new_model, X_train, y_train)
+    
+    # Evaluate both models on the same rolling hold-out set
+    X_test, y_test = holdout.data()
+    new_model_accuracy = evaluate_model(new_model, X_test, y_test)
+    if current_model is not None:
+        current_model_accuracy = evaluate_model(current_model, X_test, y_test)
+        print(f"Current Model Accuracy: {current_model_accuracy:.4f}")
+    else:
+        current_model_accuracy = 0
+    
+    print(f"New Model Accuracy: {new_model_accuracy:.4f}")
+    
+    # Log the evaluation results
+    log_training_result("current_model.pkl", current_model_accuracy, log_type="Current")
+    log_training_result("new_model.pkl", new_model_accuracy, log_type="New")
+    
+    # Deploy the updated model unless it got worse on the hold-out set
+    if new_model_accuracy >= current_model_accuracy:
+        print("Updated model performs at least as well. Deploying updated model.")
+        save_model(new_model, "current_model.pkl")
+        log_training_result("new_model.pkl", new_model_accuracy, log_type="Deployment")
+    else:
+        print("Current model performs better. Keeping the existing model.")
+
 # Automated Retraining - Trigger every certain interval (e.g., once a day or whenever new data is available)
-def automated_retraining_loop():
+def automated_retraining_loop(incremental=False):
+    # The hold-out set outlives single cycles so models are compared on the same recent data
+    holdout = RollingHoldout() if incremental else None
     while True:
         print(f"Starting retraining process at {datetime.now()}")
-        retraining_pipeline()
+        if incremental:
+            incremental_retraining_pipeline(holdout)
+        else:
+            retraining_pipeline()
         print(f"Retraining process completed at {datetime.now()}")
+        training_log.flush()  # Persist the cycle's results before idling
         time.sleep(60 * 60 * 24)  # Trigger retraining every 24 hours, adjust as needed
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+from collections.abc import Mapping
+import numpy as np
+
+class InternTable:
+    def __init__(self):
+        """
+        Maps strings such as wallet or token addresses to small integer ids and back.
+        Ids are assigned in first-seen order and are local to the process that made them.
+        """
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        """
+        Returns the id of `value`, assigning a new one on first sight.
+        """
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+    def lookup(self, value):
+        """
+        Returns the id of `value`, or -1 if it was never interned.
+        """
+        return self.ids.get(value, -1)
+
+    def resolve(self, value_id):
+        return self.values[value_id]
+
+    def __len__(self):
+        return len(self.values)
+
+# Process-wide intern tables shared by the pipeline and the detectors
+wallets = InternTable()
+tokens = InternTable()
+
+# Columnar layout for transaction batches: 32 bytes per transaction
+TRANSACTION_DTYPE = np.dtype([
+    ("tx_id", np.int64),
+    ("wallet", np.uint32),  # Id in the `wallets` intern table
+    ("token", np.uint32),   # Id in the `tokens` intern table
+    ("amount", np.float64),
+    ("timestamp", np.float64),
+])
+
+TRANSACTION_FIELDS = TRANSACTION_DTYPE.names
+
+class Transaction(Mapping):
+    """
+    Compact single-event transaction record.
+
+    Wallet and token addresses are stored as interned ids. The record also behaves
+    as a read-only mapping with the same keys as the dicts used elsewhere, such as
+    tx["wallet"] returning the address, so code written for dicts keeps working.
+    """
+    __slots__ = ("tx_id", "wallet_id", "token_id", "amount", "timestamp")
+
+    def __init__(self, tx_id, wallet, amount, timestamp, token=""):
+        self.tx_id = tx_id
+        self.wallet_id = wallets.intern(wallet)
+        self.token_id = tokens.intern(token)
+        self.amount = amount
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("tx_id", 0), data.get("wallet", ""), data.get("amount"),
+                   data.get("timestamp"), data.get("token", ""))
+
+    @property
+    def wallet(self):
+        return wallets.resolve(self.wallet_id)
+
+    @property
+    def token(self):
+        return tokens.resolve(self.token_id)
+
+    def __getitem__(self, key):
+        if key not in TRANSACTION_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(TRANSACTION_FIELDS)
+
+    def __len__(self):
+        return len(TRANSACTION_FIELDS)
+
+    def __repr__(self):
+        return (f"Transaction(tx_id={self.tx_id}, wallet={self.wallet!r}, token={self.token!r}, "
+                f"amount={self.amount}, timestamp={self.timestamp})")
+
+def to_records(transactions, out=None):
+    """
+    Packs Transaction objects or transaction dicts into a TRANSACTION_DTYPE array.
+    An existing record array is passed through, or copied into `out` when given.
+
+    :param out: Optional preallocated array to fill; it must hold len(transactions) rows.
+    :return: Record array holding exactly the given transactions.
+    """
+    if isinstance(transactions, np.ndarray):
+        if out is None:
+            return transactions
+        out[:len(transactions)] = transactions
+        return out[:len(transactions)]
+    records = np.empty(len(transactions), dtype=TRANSACTION_DTYPE) if out is None else out[:len(transactions)]
+    for i, tx in enumerate(transactions):
+        if not isinstance(tx, Transaction):
+            tx = Transaction.from_dict(tx)
+        records[i] = (tx.tx_id, tx.wallet_id, tx.token_id, tx.amount, tx.timestamp)
+    return records
+
+def to_dicts(records):
+    """
+    Expands records back into plain dicts with decoded addresses, e.g. for API output.
+    """
+    return [
+        {
+            "tx_id": int(row["tx_id"]),
+            "wallet": wallets.resolve(row["wallet"]),
+            "token": tokens.resolve(row["token"]),
+            "amount": float(row["amount"]),
+            "timestamp": float(row["timestamp"]),
+        }
+        for row in records
+    ]
+
+class TransactionWindow:
+    def __init__(self, window_size):
+        """
+        Fixed-size ring buffer holding the most recent transactions as records.
+
+        :param window_size: Number of transactions kept; older ones are overwritten.
+        """
+        self.window_size = window_size
+        self.buffer = np.zeros(window_size, dtype=TRANSACTION_DTYPE)
+        self.position = 0
+        self.size = 0
+
+    def append(self, transaction):
+        """
+        Adds a Transaction or transaction dict.
+        """
+        if not isinstance(transaction, Transaction):
+            transaction = Transaction.from_dict(transaction)
+        self.buffer[self.position] = (transaction.tx_id, transaction.wallet_id, transaction.token_id,
+                                      transaction.amount, transaction.timestamp)
+        self.position = (self.position + 1) % self.window_size
+        self.size = min(self.size + 1, self.window_size)
+
+    def extend(self, records):
+        """
+        Adds a TRANSACTION_DTYPE batch in one copy.
+        """
+        records = records[-self.window_size:]
+        idx = (self.position + np.arange(len(records))) % self.window_size
+        self.buffer[idx] = records
+        self.position = (self.position + len(records)) % self.window_size
+        self.size = min(self.size + len(records), self.window_size)
+
+    def records(self):
+        """
+        Returns the buffered transactions, oldest first.
+        """
+        if self.size < self.window_size:
+            return self.buffer[:self.size]
+        return np.roll(self.buffer, -self.position)
+
+    def __len__(self):
+        return self.size
@@ -1,6 +1,7 @@
 import time
 import numpy as np
 import pandas as pd
+from transactions import TransactionWindow, to_dicts, wallets
 
 class WhaleDetectionSystem:
     def __init__(self, threshold=1000000, window_size=10):
@@ -11,23 +12,28 @@ class WhaleDetectionSystem:
         """
         self.threshold = threshold
         self.window_size = window_size
-        self.transaction_history = []
+        self.transaction_history = TransactionWindow(window_size)
     
     def ingest_transaction(self, transaction):
         """
         Ingests a new transaction into the system.
-        :param transaction: A dictionary containing 'wallet', 'amount', and 'timestamp'.
+        :param transaction: A Transaction record or a dictionary containing 'wallet', 'amount', and 'timestamp'.
         """
         self.transaction_history.append(transaction)
-        if len(self.transaction_history) > self.window_size:
-            self.transaction_history.pop(0)
+    
+    def ingest_batch(self, records):
+        """
+        Ingests a batch of transactions at once.
+        :param records: Structured array with the TRANSACTION_DTYPE layout.
+        """
+        self.transaction_history.extend(records)
     
     def detect_accumulation_pattern(self):
         """
         Detects accumulation patterns based on transaction history.
         :return: A dictionary with detected patterns and analysis.
         """
-        df = pd.DataFrame(self.transaction_history)
+        df = pd.DataFrame(self.transaction_history.records())
         if df.empty:
             return {"status": "No transactions available for analysis."}
         
@@ -40,7 +46,7 @@ class WhaleDetectionSystem:
         return {
             "accumulation_detected": accumulation_detected,
             "total_whale_transactions": len(whale_transactions),
-            "latest_transactions": df.tail(5).to_dict(orient='records')
+            "latest_transactions": to_dicts(self.transaction_history.records()[-5:])
         }
     
     def analyze_wallet_behavior(self, wallet_address):
@@ -49,11 +55,11 @@ class WhaleDetectionSystem:
         :param wallet_address: Wallet address to analyze.
         :return: Analysis report.
         """
-        df = pd.DataFrame(self.transaction_history)
+        df = pd.DataFrame(self.transaction_history.records())
         if df.empty:
             return {"status": "No transactions available for analysis."}
         
-        wallet_transactions = df[df['wallet'] == wallet_address]
+        wallet_transactions = df[df['wallet'] == wallets.lookup(wallet_address)]
         total_value = wallet_transactions['amount'].sum()
         avg_value = wallet_transactions['amount'].mean() if not wallet_transactions.empty else 0
         
@@ -1,8 +1,297 @@
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+import multiprocessing
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+def _gcra(tat: float, now: float, emission_interval: float, limit: float, cost: int) -> Tuple[Optional[float], float]:
+    """
+    Generic cell rate algorithm step. Returns (new_tat, 0.0) if the request fits,
+    else (None, seconds until it would fit).
+    """
+    new_tat = max(tat, now) + emission_interval * cost
+    wait = new_tat - now - limit
+    # Tolerate rounding, so a full burst of `limit / emission_interval` requests fits exactly
+    if wait > limit * 1e-9:
+        return None, wait
+    return new_tat, 0.0
+
+def _gcra_many(tats: Sequence[float], now: float, limits: Sequence[Tuple[str, float, float]],
+               cost: int) -> Tuple[Optional[List[float]], float]:
+    """
+    Applies one GCRA step per (key, emission_interval, limit). Returns the new TATs if
+    every limit admits the request, else (None, seconds until all of them would).
+    """
+    new_tats = []
+    wait = 0.0
+    for tat, (_, emission_interval, limit) in zip(tats, limits):
+        new_tat, key_wait = _gcra(tat, now, emission_interval, limit, cost)
+        new_tats.append(new_tat)
+        wait = max(wait, key_wait)
+    return (None, wait) if wait else (new_tats, 0.0)
+
+class RateLimitBackend(ABC):
+    """
+    Stores one theoretical arrival time (TAT) per key and applies GCRA updates atomically.
+    A key whose TAT has passed is idle: forgetting it does not change any decision.
+    """
+    async def update(self, key: str, emission_interval: float, limit: float, cost: int = 1) -> float:
+        """Consumes `cost` requests if allowed; returns 0.0 if so, else seconds until they would be."""
+        return await self.update_many([(key, emission_interval, limit)], cost)
+
+    @abstractmethod
+    async def update_many(self, limits: Sequence[Tuple[str, float, float]], cost: int = 1) -> float:
+        """
+        Checks several (key, emission_interval, limit) entries in one atomic step and consumes
+        `cost` from all of them only if every one allows it. Returns 0.0 if allowed, else
+        seconds until all of them would allow it.
+        """
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process backend; updates run without awaiting, so they are atomic under asyncio."""
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.tats = OrderedDict()  # key -> TAT, least recently updated first
+
+    async def update_many(self, limits: Sequence[Tuple[str, float, float]], cost: int = 1) -> float:
+        now = self.clock()
+        new_tats, wait = _gcra_many([self.tats.get(key, now) for key, _, _ in limits], now, limits, cost)
+        if new_tats is not None:
+            for (key, _, _), new_tat in zip(limits, new_tats):
+                self.tats[key] = new_tat
+                self.tats.move_to_end(key)
+        self._expire_idle(now)
+        return wait
+
+    def _expire_idle(self, now: float, max_keys: int = 2):
+        # Amortized sweep: each update drops at most a couple of idle keys from the old end
+        for _ in range(max_keys):
+            if not self.tats:
+                return
+            key, tat = next(iter(self.tats.items()))
+            if tat > now:
+                return
+            del self.tats[key]
+
+    def __len__(self) -> int:
+        return len(self.tats)
+
+class SharedMemoryBackend(RateLimitBackend):
+    """
+    Backend shared by worker processes through a fixed-size hash table in shared memory.
+
+    Create it in the parent before forking the workers, or attach from another process
+    by passing the table's `name` and the creator's `lock`. Idle slots are reused, so the
+    table never grows; if all probed slots of a key are busy, it shares its home slot.
+    Keys sharing a slot, in one call or across calls, are charged against a single TAT
+    that keeps the strictest of their results and is never moved back, so sharing can
+    deny requests early but never admits more than a key's own limit allows.
+    """
+    MAX_PROBES = 8
+    SLOT_DTYPE = np.dtype([("fingerprint", np.uint64), ("tat", np.float64)])
+
+    def __init__(self, slots: int = 1 << 16, name: Optional[str] = None, lock=None):
+        self.slots = slots
+        self.owner = name is None
+        size = slots * self.SLOT_DTYPE.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=size) if self.owner else shared_memory.SharedMemory(name=name)
+        self.table = np.ndarray(slots, dtype=self.SLOT_DTYPE, buffer=self.shm.buf)
+        if self.owner:
+            self.table[:] = 0
+        self.name = self.shm.name
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+
+    def _slot(self, fingerprint: int, now: float) -> int:
+        home = fingerprint % self.slots
+        probes = [(home + i) % self.slots for i in range(self.MAX_PROBES)]
+        for slot in probes:
+            if self.table["fingerprint"][slot] == fingerprint:
+                return slot
+        for slot in probes:
+            if self.table["tat"][slot] <= now:
+                return slot
+        return home
+
+    async def update_many(self, limits: Sequence[Tuple[str, float, float]], cost: int = 1) -> float:
+        # Python's hash() differs between processes, so keys are fingerprinted with a stable hash
+        fingerprints = [int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+                        for key, _, _ in limits]
+        with self.lock:
+            now = time.time()
+            slots = [self._slot(fingerprint, now) for fingerprint in fingerprints]
+            # An idle slot's TAT is in the past, so it counts as a fresh key; a busy slot of
+            # another key is shared, taking on its later TAT rather than resetting it
+            tats = [float(self.table["tat"][slot]) for slot in slots]
+            new_tats, wait = _gcra_many(tats, now, limits, cost)
+            if new_tats is not None:
+                # Keys of one call can land in the same slot; it keeps the latest of their
+                # TATs, and an idle slot goes to the key that set it
+                updates = {}
+                for fingerprint, slot, new_tat in zip(fingerprints, slots, new_tats):
+                    if slot not in updates or new_tat > updates[slot][1]:
+                        updates[slot] = (fingerprint, new_tat)
+                for slot, (fingerprint, new_tat) in updates.items():
+                    if self.table["tat"][slot] <= now:
+                        self.table["fingerprint"][slot] = fingerprint
+                    self.table["tat"][slot] = new_tat
+        return wait
+
+    def close(self):
+        del self.table
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class RedisBackend(RateLimitBackend):
+    """
+    Backend on a Redis server (or a Redis-compatible local stand-in), shared by every
+    process using it. Each update is one atomic script call on the server's clock, and
+    keys expire in Redis as soon as they become idle.
+
+    :param client: A redis.asyncio.Redis client.
+    """
+    SCRIPT = """
+        local cost = tonumber(ARGV[1])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local new_tats = {}
+        local wait = 0
+        for i, key in ipairs(KEYS) do
+            local emission_interval = tonumber(ARGV[2 * i])
+            local limit = tonumber(ARGV[2 * i + 1])
+            local tat = math.max(tonumber(redis.call('GET', key)) or now, now)
+            new_tats[i] = tat + emission_interval * cost
+            local key_wait = new_tats[i] - now - limit
+            if key_wait > limit * 1e-9 then
+                wait = math.max(wait, key_wait)
+            end
+        end
+        if wait > 0 then
+            return tostring(wait)
+        end
+        for i, key in ipairs(KEYS) do
+            redis.call('SET', key, tostring(new_tats[i]), 'PX', math.ceil((new_tats[i] - now) * 1000))
+        end
+        return '0'
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.prefix = prefix
+        self.script = client.register_script(self.SCRIPT)
+
+    async def update_many(self, limits: Sequence[Tuple[str, float, float]], cost: int = 1) -> float:
+        args = [cost]
+        for _, emission_interval, limit in limits:
+            args += [emission_interval, limit]
+        wait = await self.script(keys=[self.prefix + key for key, _, _ in limits], args=args)
+        return float(wait)
+
 class RateLimiter:
-    def __init__(self, rate_limit: int = 100, window: int = 60):
+    def __init__(self, rate_limit: int = 100, window: int = 60, burst: Optional[int] = None,
+                 backend: Optional[RateLimitBackend] = None):
+        """
+        GCRA rate limiter: one timestamp per key instead of a list of request times.
+
+        Requests are admitted at rate_limit per window on average, with up to `burst`
+        requests at once (rate_limit by default, like a fixed window of that size).
+        """
         self.rate_limit = rate_limit
         self.window = window
-        self.requests = defaultdict(list)
-        
+        self.burst = burst if burst is not None else rate_limit
+        self.emission_interval = window / rate_limit
+        self.limit = self.burst * self.emission_interval
+        self.backend = backend if backend is not None else MemoryBackend()
+
+    def _check_cost(self, cost: int):
+        if not 1 <= cost <= self.burst:
+            raise ValueError(f"cost must be between 1 and the burst size {self.burst}, got {cost}.")
+
     async def is_allowed(self, key: str) -> bool:
         """Check if request is allowed under rate limit."""
+        return await self.acquire(key) == 0.0
+
+    async def acquire(self, key: str, cost: int = 1) -> float:
+        """
+        Consumes `cost` requests at once if they fit, e.g. one per token of a bulk request.
+        Returns 0.0 if allowed, else the seconds until they would be.
+        """
+        self._check_cost(cost)
+        return await self.backend.update(key, self.emission_interval, self.limit, cost)
+
+    async def wait_until_allowed(self, key: str, cost: int = 1):
+        """Sleeps until `cost` requests are admitted, waking only when capacity has freed up."""
+        while True:
+            wait = await self.acquire(key, cost)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+class HierarchicalRateLimiter:
+    def __init__(self, levels: Dict[str, RateLimiter], backend: Optional[RateLimitBackend] = None):
+        """
+        Applies several nested limits, e.g. global, per API key and per endpoint, in one
+        backend operation: a request is admitted only if every level admits it, and only
+        then is it counted against all of them.
+
+        :param levels: Level name -> RateLimiter giving that level's rate, window and burst.
+            The limiters' own backends are not used.
+        :param backend: Backend holding the state of all levels.
+        """
+        self.levels = levels
+        self.backend = backend if backend is not None else MemoryBackend()
+
+    def _limits(self, scopes: Dict[str, str], cost: int) -> List[Tuple[str, float, float]]:
+        limits = []
+        for name, limiter in self.levels.items():
+            limiter._check_cost(cost)
+            # A level without a scope value, such as "global", has a single shared key
+            limits.append((f"{name}:{scopes.get(name, '*')}", limiter.emission_interval, limiter.limit))
+        return limits
+
+    async def acquire(self, scopes: Dict[str, str], cost: int = 1) -> float:
+        """
+        Consumes `cost` requests at every level if all of them allow it.
+
+        :param scopes: Key of the request at each level, e.g. {"api_key": ..., "endpoint": ...}.
+        :return: 0.0 if allowed, else the seconds until every level would allow it.
+        """
+        return await self.backend.update_many(self._limits(scopes, cost), cost)
+
+    async def is_allowed(self, scopes: Dict[str, str]) -> bool:
+        return await self.acquire(scopes) == 0.0
+
+    async def wait_until_allowed(self, scopes: Dict[str, str], cost: int = 1):
+        """Sleeps until `cost` requests are admitted at every level."""
+        limits = self._limits(scopes, cost)
+        while True:
+            wait = await self.backend.update_many(limits, cost)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+async def _check_shared_memory_parity(slots: int = 1, requests: int = 100) -> Tuple[int, int]:
+    """
+    Admits the same burst through MemoryBackend and a tiny SharedMemoryBackend, where
+    every key collides, and returns how many requests each one admitted.
+    """
+    levels = {"global": RateLimiter(5, 60), "api_key": RateLimiter(100, 60), "endpoint": RateLimiter(50, 60)}
+    scopes = {"api_key": "demo", "endpoint": "monitor"}
+    shared = SharedMemoryBackend(slots=slots)
+    try:
+        admitted = []
+        for backend in (MemoryBackend(clock=time.time), shared):
+            limiter = HierarchicalRateLimiter(levels, backend)
+            admitted.append(sum([await limiter.is_allowed(scopes) for _ in range(requests)]))
+    finally:
+        shared.close()
+    return admitted[0], admitted[1]
+
+if __name__ == "__main__":
+    for slots in (1, 2, 4):
+        memory, shared = asyncio.run(_check_shared_memory_parity(slots))
+        print(f"{slots} slot(s): memory admitted {memory}, shared memory admitted {shared}")
+        assert memory == shared, "SharedMemoryBackend must not admit more than MemoryBackend"